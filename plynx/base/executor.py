@@ -65,6 +65,13 @@ class BaseExecutor(ABC):
         The reason can be the fact it was working too long or parent executor canceled it.
         """
 
+    def abandon(self):
+        """Stop the execution because the run has been leased to another worker.
+
+        Unlike `kill()` it must not affect the other runs, i.e. the ones the new owner is going to monitor.
+        """
+        self.kill()
+
     def is_updated(self) -> bool:
         """Function that is regularly called by a Worker.
 
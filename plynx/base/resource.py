@@ -1,6 +1,6 @@
 """Templates for PLynx Resources and utils."""
 from collections import namedtuple
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Optional
 
 from plynx.constants import NodeResources
 
@@ -28,6 +28,18 @@ class BaseResource:
         """Resource preprocessor"""
         return {NodeResources.INPUT: filename}
 
+    @staticmethod
+    def stage_input(stream: BinaryIO, filename: str) -> bool:   # pylint: disable=unused-argument
+        """Write the input directly from the storage stream to `filename`, i.e. extract it while it is being downloaded.
+
+        Called only for the resources that override it.
+
+        Return:
+            (bool)  True if the input has been staged, False if the stream has not been used and the resource
+                    has to be downloaded to `filename` as is
+        """
+        return False
+
     @staticmethod
     def prepare_output(filename: str, preview: bool = False) -> Dict[str, str]:
         """Prepare output"""
@@ -9,6 +9,7 @@ from plynx import __version__
 from plynx.service.cache import run_cache
 from plynx.service.execute import run_execute
 from plynx.service.make_operations_meta import run_make_operations_meta
+from plynx.service.profile import run_profile
 from plynx.service.users import run_users
 from plynx.service.worker import run_worker
 from plynx.utils.config import get_config, set_parameter
@@ -64,6 +65,12 @@ def users(args):
     run_users(**args)
 
 
+def profile(args):
+    """Print the per-Operation profiling report."""
+    set_logging_level(args.pop("verbose"))
+    run_profile(**args)
+
+
 def version(args):  # pylint: disable=unused-argument
     """Print PLynx version"""
     print(__version__)
@@ -123,6 +130,34 @@ class CLIFactory:
             action="append",
             levels=["worker", "kinds"],
             ),
+        "warm_up": Arg(
+            ("--warm-up",),
+            help="Stateful python Operations (code function locations) to initialize when the worker starts",
+            default=_config.worker.warm_up,
+            action="append",
+            levels=["worker", "warm_up"],
+            ),
+        "profiling": Arg(
+            ("--profiling",),
+            help="Record time and memory used by the Operations: `off`, `rss` or `tracemalloc`",
+            default=_config.worker.profiling,
+            type=str,
+            levels=["worker", "profiling"],
+            ),
+        "resource_cache_dir": Arg(
+            ("--resource-cache-dir",),
+            help="Directory of the worker-local cache of the input resources",
+            default=_config.worker.resource_cache_dir,
+            type=str,
+            levels=["worker", "resource_cache_dir"],
+            ),
+        "resource_cache_size": Arg(
+            ("--resource-cache-size",),
+            help="Size limit of the worker-local cache of the input resources in bytes, 0 disables the cache",
+            default=_config.worker.resource_cache_size,
+            type=int,
+            levels=["worker", "resource_cache_size"],
+            ),
 
         # MongoConfig
         "db_host": Arg(
@@ -252,7 +287,8 @@ class CLIFactory:
         {
             "func": worker,
             "help": "Run Worker",
-            "args": ("verbose", "db_host", "db_port", "db_user", "db_password", "kinds", "internal_endpoint",
+            "args": ("verbose", "db_host", "db_port", "db_user", "db_password", "kinds", "warm_up", "profiling",
+                     "resource_cache_dir", "resource_cache_size", "internal_endpoint",
                      "storage_scheme", "storage_prefix", "credential_path"),
         }, {
             "func": api,
@@ -276,6 +312,10 @@ class CLIFactory:
             "func": cache,
             "help": "Cache cli utils",
             "args": ("verbose", "mode", "start_datetime", "end_datetime", "yes"),
+        }, {
+            "func": profile,
+            "help": "Report time and memory used by the Operations",
+            "args": ("verbose", "start_datetime", "end_datetime"),
         }, {
             "func": execute,
             "help": "Execute single node",
@@ -122,4 +122,4 @@ class NodeOrigin:
     BUILT_IN_HUBS: str = "BUILT_IN_HUBS"
 
 
-IGNORED_CACHE_PARAMETERS = {"cmd", "_timeout"}
+IGNORED_CACHE_PARAMETERS = {"cmd", "_timeout", "_retries", "_retry_backoff", "_profile"}
@@ -1,4 +1,5 @@
 """Node DB Object and utils"""
+import copy
 from dataclasses import dataclass, field
 from typing import Any, Callable, List, Optional, Union
 
@@ -68,13 +69,17 @@ def _clone_update_in_place(node: "Node", node_clone_policy: int, override_finish
             if override_finished_state or not NodeRunningStatus.is_succeeded(sub_node.node_running_status):
                 for output in sub_node.outputs:
                     output.values = []
+                    output.checksum = None
 
                 for log in sub_node.logs:
                     log.values = []
+                sub_node.profile = None
 
     if override_finished_state or not NodeRunningStatus.is_succeeded(node.node_running_status):
         for output_or_log in node.outputs + node.logs:
             output_or_log.values = []
+            output_or_log.checksum = None
+        node.profile = None
     return node
 
 
@@ -94,6 +99,8 @@ class Output(_BaseResource):
     """Basic Output structure."""
 
     thumbnail: Optional[str] = None
+    # sha256 of the content of the resource, if it was computed on upload. Identical outputs have the same checksum.
+    checksum: Optional[str] = None
 
 
 @dataclass_json
@@ -122,6 +129,25 @@ class Input(_BaseResource):
         self.input_references.append(InputReference(node_id=node_id, output_id=output_id))
 
 
+def _copy_resource(resource: _BaseResource) -> Any:
+    res = copy.copy(resource)
+    res.values = list(resource.values)
+    return res
+
+
+@dataclass_json
+@dataclass
+class NodeProfile(DBObject):
+    """Resources used by the last execution of the Node"""
+    mode: str = ""
+    # Seconds
+    wall_time: float = 0
+    cpu_time: Optional[float] = None
+    # Bytes, process-wide: either the RSS high-water mark of the process or the peak of the python allocations
+    # traced while the Node was running, depending on `mode`. Max RSS of the subprocess if the Node runs one.
+    peak_memory: Optional[int] = None
+
+
 @dataclass_json
 @dataclass
 class CachedNode(DBObject):
@@ -170,6 +196,8 @@ class Node(DBObject):
     auto_run_enabled: bool = True
     # latest_run_id would be used in Templates to refer to the current run
     latest_run_id: Optional[ObjectId] = None
+    # Set by the executors when profiling is enabled
+    profile: Optional[NodeProfile] = None
 
     inputs: List[Input] = field(default_factory=list)
     parameters: List["Parameter"] = field(default_factory=list)
@@ -221,6 +249,23 @@ class Node(DBObject):
         node = _clone_update_in_place(Node.from_dict(self.to_dict()), node_clone_policy, override_finished_state, override_node_id=True)
         return node
 
+    def snapshot(self) -> "Node":
+        """Return a lightweight copy of a Node that is used to hand off the job to an executor.
+
+        Unlike `copy()`, it does not serialize the Node. Inputs, outputs and logs are copied because
+        executors fill them in, while parameters and input references are shared.
+        Parameters with subnodes are the exception, since their subnodes change during execution.
+        """
+        node = copy.copy(self)
+        node.inputs = [_copy_resource(node_input) for node_input in self.inputs]
+        node.outputs = [_copy_resource(output) for output in self.outputs]
+        node.logs = [_copy_resource(log) for log in self.logs]
+        node.parameters = [
+            parameter.copy() if parameter.parameter_type == ParameterTypes.LIST_NODE else parameter
+            for parameter in self.parameters
+        ]
+        return node
+
     def _get_custom_element(
                 self,
                 arr: Union[List[Input], List["Parameter"], List[Output]],
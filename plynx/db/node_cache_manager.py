@@ -40,6 +40,43 @@ class NodeCacheManager:
         else:
             return None
 
+    @staticmethod
+    def get_many(nodes: List[Node]) -> List[Optional[NodeCache]]:
+        """Pull NodeCache of multiple Nodes in a single query.
+
+        Args:
+            nodes       (list of Node):     Node objects
+
+        Return:
+            (list of NodeCache)     NodeCache or None for each of the nodes in the same order
+        """
+        keys = [NodeCache.generate_key(node) for node in nodes]
+        if not keys:
+            return []
+        aggregate_list: List[Dict[str, Any]] = [
+            {
+                "$match": {
+                    "key": {"$in": list(set(keys))},
+                    "removed": {"$ne": True},
+                }
+            },
+            {
+                "$sort": {"insertion_date": -1}
+            },
+            {
+                # Only the latest cache of each key is returned by the database
+                "$group": {
+                    "_id": "$key",
+                    "cache": {"$first": "$$ROOT"},
+                }
+            },
+        ]
+        key_to_cache: Dict[str, NodeCache] = {
+            res["_id"]: NodeCache.from_dict(res["cache"])
+            for res in get_db_connector().node_cache.aggregate(aggregate_list)
+        }
+        return [key_to_cache.get(key) for key in keys]
+
     @staticmethod
     def post(node: Node, run_id: ObjectId) -> bool:
         """Create NodeCache instance in the database.
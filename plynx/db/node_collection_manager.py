@@ -1,5 +1,6 @@
 """Node collection manager and utils"""
 
+import datetime
 import logging
 from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Union
@@ -141,6 +142,82 @@ class NodeCollectionManager:
 
         return list(db_objects)
 
+    def get_running_statuses(self, ids: List[ObjectId]) -> Dict[ObjectId, str]:
+        """Get `node_running_status` of the Objects with a given IDs in a single query.
+
+        Args:
+            ids    (list of ObjectID):  Object Ids
+
+        Return:
+            (dict)  Mapping from Object ID to its running status. Missing Objects are not included.
+        """
+        if not ids:
+            return {}
+        db_objects = get_db_connector()[self.collection].find(
+            {"_id": {"$in": list(ids)}},
+            {"node_running_status": 1},
+        )
+        return {db_object["_id"]: db_object["node_running_status"] for db_object in db_objects}
+
+    def get_average_run_times(self, original_node_ids: List[ObjectId]) -> Dict[ObjectId, float]:
+        """Get average run time in seconds of the successful runs of the Operations.
+
+        The run time is measured from the moment the run was put on the queue until its last update.
+
+        Args:
+            original_node_ids   (list of ObjectID):  Ids of the Operations
+
+        Return:
+            (dict)  Mapping from Operation ID to its average run time. Operations without history are not included.
+        """
+        if not original_node_ids:
+            return {}
+        aggregate_list: List[Dict[str, Any]] = [
+            {
+                "$match": {
+                    "original_node_id": {"$in": list(original_node_ids)},
+                    "node_running_status": NodeRunningStatus.SUCCESS,
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$original_node_id",
+                    "run_time_ms": {"$avg": {"$subtract": ["$update_date", "$insertion_date"]}},
+                }
+            },
+        ]
+        return {
+            res["_id"]: res["run_time_ms"] / 1000.
+            for res in get_db_connector()[self.collection].aggregate(aggregate_list)
+            if res["run_time_ms"] is not None
+        }
+
+    def get_finished_runs(
+            self,
+            start_datetime: Optional[datetime.datetime] = None,
+            end_datetime: Optional[datetime.datetime] = None,
+            ):
+        """List the finished runs created in a given time frame.
+
+        Args:
+            start_datetime  (datetime, None):   Start datetime or None if selecting from beginning
+            end_datetime    (datetime, None):   End datetime or None if selecting until now
+
+        Return:
+            Iterator on the list of dict-like objects
+        """
+        insertion_query: Dict[str, datetime.datetime] = {}
+        if start_datetime:
+            insertion_query["$gte"] = start_datetime
+        if end_datetime:
+            insertion_query["$lt"] = end_datetime
+        query: Dict[str, Any] = {
+            "node_running_status": {"$in": sorted(NodeRunningStatus._FINISHED_STATUSES)},  # pylint: disable=protected-access
+        }
+        if insertion_query:
+            query["insertion_date"] = insertion_query
+        return get_db_connector()[self.collection].find(query)
+
     def _update_sub_nodes_fields(
             self,
             sub_nodes_dicts: List[Dict],
@@ -293,8 +370,25 @@ class NodeCollectionManager:
         main_node.get_parameter_by_name("_nodes").value.value = new_nodes
         return upgraded_nodes_count
 
-    def pick_node(self, kinds: List[str]) -> Dict:
-        """Get node and set status to RUNNING in atomic way"""
+    def pick_node(self, kinds: List[str], worker_id: Optional[str] = None, lease_duration: Optional[float] = None) -> Dict:
+        """Get node and set status to RUNNING in atomic way.
+
+        If `lease_duration` is given, the run is leased to the worker: `worker_id` and `lease_expiration_date`
+        are stored in the run. The worker is expected to renew the lease while it is executing the run.
+        Runs with expired leases are considered abandoned, i.e. the worker crashed, and they are picked again.
+
+        Args:
+            kinds           (list of str):  Kinds the worker can execute
+            worker_id       (str, None):    ID of the worker
+            lease_duration  (float, None):  Duration of the lease in seconds
+        """
+        now = datetime.datetime.utcnow()
+        update: Dict[str, Any] = {
+            "node_running_status": NodeRunningStatus.RUNNING,
+        }
+        if lease_duration:
+            update["worker_id"] = worker_id
+            update["lease_expiration_date"] = now + datetime.timedelta(seconds=lease_duration)
         node = get_db_connector()[self.collection].find_one_and_update(
             {
                 "$and": [
@@ -304,20 +398,54 @@ class NodeCollectionManager:
                         }
                     },
                     {
-                        "node_running_status": {
-                            "$in": [
-                                NodeRunningStatus.READY,
-                                NodeRunningStatus.IN_QUEUE,
-                            ]
-                        }
+                        "$or": [
+                            {
+                                "node_running_status": {
+                                    "$in": [
+                                        NodeRunningStatus.READY,
+                                        NodeRunningStatus.IN_QUEUE,
+                                    ]
+                                }
+                            },
+                            {
+                                "node_running_status": NodeRunningStatus.RUNNING,
+                                "lease_expiration_date": {"$lt": now},
+                            },
+                        ]
                     },
                 ],
             },
             {
-                "$set": {
-                    "node_running_status": NodeRunningStatus.RUNNING
-                }
+                "$set": update
             },
             return_document=ReturnDocument.AFTER
         )
         return node
+
+    def renew_leases(self, run_ids: List[ObjectId], worker_id: str, lease_duration: float) -> List[ObjectId]:
+        """Extend the leases of the runs that are still executed by the worker.
+
+        Args:
+            run_ids         (list of ObjectId): Run IDs
+            worker_id       (str):              ID of the worker
+            lease_duration  (float):            Duration of the lease in seconds
+
+        Return:
+            (list of ObjectId)  Run IDs with renewed leases
+        """
+        run_ids = [to_object_id(run_id) for run_id in run_ids]
+        query = {
+            "_id": {"$in": run_ids},
+            "worker_id": worker_id,
+            "node_running_status": NodeRunningStatus.RUNNING,
+        }
+        renewed_run_ids = [db_object["_id"] for db_object in get_db_connector()[self.collection].find(query, {"_id": 1})]
+        get_db_connector()[self.collection].update_many(
+            query,
+            {
+                "$set": {
+                    "lease_expiration_date": datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_duration),
+                }
+            },
+        )
+        return renewed_run_ids
@@ -0,0 +1,83 @@
+"""Notifications about Runs that reached a finished status"""
+import functools
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from pymongo.errors import PyMongoError
+
+from plynx.constants import Collections, NodeRunningStatus
+from plynx.utils.common import ObjectId, to_object_id
+from plynx.utils.db_connector import get_db_connector
+
+
+class RunStatusWatcher:
+    """RunStatusWatcher wakes up the subscribers as soon as a Run is finished.
+
+    There are two sources of the notifications:
+        * `notify()` called in the same process, i.e. by the worker that has just finished the job.
+        * MongoDB change stream on the `runs` collection. Change streams require a replica set.
+          If they are not available, the watcher stops and the subscribers rely on polling.
+    """
+
+    def __init__(self, use_change_stream: bool = True):
+        self._lock = threading.Lock()
+        self._run_id_to_events: Dict[ObjectId, Set[threading.Event]] = defaultdict(set)
+        self._use_change_stream = use_change_stream
+        self._change_stream_thread: Optional[threading.Thread] = None
+
+    def subscribe(self, run_id: ObjectId, event: threading.Event):
+        """Set the `event` when the Run with `run_id` is finished"""
+        with self._lock:
+            self._run_id_to_events[to_object_id(run_id)].add(event)
+        self._start_change_stream()
+
+    def unsubscribe(self, run_id: ObjectId, event: threading.Event):
+        """Stop tracking the Run for a given event"""
+        run_id = to_object_id(run_id)
+        with self._lock:
+            events = self._run_id_to_events.get(run_id)
+            if events is None:
+                return
+            events.discard(event)
+            if not events:
+                del self._run_id_to_events[run_id]
+
+    def notify(self, run_id: ObjectId):
+        """Wake up everyone who is waiting for the Run"""
+        with self._lock:
+            events = list(self._run_id_to_events.get(to_object_id(run_id), ()))
+        for event in events:
+            event.set()
+
+    def _start_change_stream(self):
+        with self._lock:
+            if not self._use_change_stream or self._change_stream_thread:
+                return
+            self._change_stream_thread = threading.Thread(target=self._watch_runs, daemon=True)
+            self._change_stream_thread.start()
+
+    def _watch_runs(self):
+        pipeline = [
+            {
+                "$match": {
+                    "operationType": "update",
+                    "updateDescription.updatedFields.node_running_status": {
+                        "$in": sorted(NodeRunningStatus._FINISHED_STATUSES),    # pylint: disable=protected-access
+                    },
+                },
+            },
+        ]
+        try:
+            with get_db_connector()[Collections.RUNS].watch(pipeline) as stream:
+                for change in stream:
+                    self.notify(change["documentKey"]["_id"])
+        except PyMongoError as e:
+            logging.warning(f"Run status change stream is not available, falling back to polling: `{e}`")
+
+
+@functools.lru_cache()
+def run_status_watcher() -> RunStatusWatcher:
+    """Lazy process-wide RunStatusWatcher"""
+    return RunStatusWatcher()
@@ -1,7 +1,7 @@
 """Worker State DB Object and utils"""
 
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
 from dataclasses_json import dataclass_json
 
@@ -12,6 +12,19 @@ from plynx.utils.common import ObjectId
 from plynx.utils.db_connector import get_db_connector
 
 
+@dataclass_json
+@dataclass
+class ResourceCacheStats(DBObject):
+    """Usage of the worker-local resource cache"""
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.
+    # Bytes
+    size: int = 0
+    max_size: int = 0
+    num_resources: int = 0
+
+
 @dataclass_json
 @dataclass
 class WorkerState(DBObject):
@@ -23,6 +36,7 @@ class WorkerState(DBObject):
     host: str = ""
     runs: List[Node] = field(default_factory=list)
     kinds: List[str] = field(default_factory=list)
+    resource_cache: Optional[ResourceCacheStats] = None
 
 
 def get_worker_states() -> List[WorkerState]:
@@ -3,11 +3,12 @@ import functools
 import os
 import shutil
 import uuid
+from typing import List
 
 import plynx.db.run_cancellation_manager
 from plynx.base.executor import BaseExecutor, RunningStatus
-from plynx.constants import Collections
-from plynx.db.node import Node
+from plynx.constants import Collections, ParameterTypes
+from plynx.db.node import Node, Parameter
 
 
 @functools.lru_cache()
@@ -16,6 +17,28 @@ def run_cancellation_manager():
     return plynx.db.run_cancellation_manager.RunCancellationManager()
 
 
+def get_retry_parameters() -> List[Parameter]:
+    """Parameters that define how the DAG relaunches a failed Node"""
+    return [
+        Parameter(
+            name="_retries",
+            parameter_type=ParameterTypes.INT,
+            value=0,
+            mutable_type=False,
+            publicable=True,
+            removable=False
+        ),
+        Parameter(
+            name="_retry_backoff",
+            parameter_type=ParameterTypes.FLOAT,
+            value=1.0,
+            mutable_type=False,
+            publicable=True,
+            removable=False
+        ),
+    ]
+
+
 class PLynxAsyncExecutor(BaseExecutor):
     """Base Executor class that is using PLynx Async Inference backend"""
 
@@ -1,16 +1,22 @@
 """A standard executor for DAGs."""
+import copy
 import functools
+import heapq
 import logging
+import threading
 import time
-from collections import defaultdict
-from typing import Dict, List, Optional
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import plynx.base.executor
 import plynx.db.node_cache_manager
+import plynx.db.node_collection_manager
+import plynx.db.run_status_watcher
 import plynx.plugins.executors.bases
 import plynx.utils.executor
+import plynx.utils.plugin_manager
 from plynx.constants import Collections, NodeRunningStatus, ParameterTypes, SpecialNodeId, ValidationCode, ValidationTargetType
-from plynx.db.node import Node, Parameter
+from plynx.db.node import Input, Node, Output, Parameter
 from plynx.db.validation_error import ValidationError
 from plynx.utils.common import ObjectId, to_object_id
 
@@ -31,6 +37,12 @@ def node_cache_manager():
     return plynx.db.node_cache_manager.NodeCacheManager()
 
 
+@functools.lru_cache()
+def runs_collection_manager():
+    """Lazy NodeCollectionManager of the runs"""
+    return plynx.db.node_collection_manager.NodeCollectionManager(collection=Collections.RUNS)
+
+
 class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
     """ Main graph scheduler.
 
@@ -41,28 +53,50 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
     # pylint: disable=too-many-instance-attributes
 
     IS_GRAPH = True
+    # Fallback polling interval. The scheduler is normally woken up by the RunStatusWatcher.
     GRAPH_ITERATION_SLEEP = 1
+    # Weight the priorities of the subnodes with their historical run time from the runs collection
+    USE_RUN_TIME_HISTORY = True
+    # Expected run time (sec) of an Operation without history
+    DEFAULT_NODE_RUN_TIME = 1.0
+    # The DAG can be executed inline by the parent DAG scheduler
+    CAN_BE_INLINED = True
+    # Relaunch the failed subnodes according to their `_retries` and `_retry_backoff` parameters
+    RETRY_FAILED_NODES = True
 
     def __init__(self, node: Node):
-        # pylint: disable=too-many-branches
+        # pylint: disable=too-many-branches,too-many-statements
         super().__init__(node)
         assert self.node, "Attribute `node` is not defined"
 
         self.subnodes: List[Node] = self.node.get_sub_nodes()
 
+        # Nested DAGs can be executed by this scheduler directly, see `_inline_sub_dags`
+        self.node_id_to_graph_id: Dict[ObjectId, Optional[ObjectId]] = {}
+        self.inlined_graph_id_to_node: Dict[ObjectId, Node] = {}
+        self.inlined_graph_id_to_output_node: Dict[ObjectId, Node] = {}
+        self.inlined_graph_id_to_uncompleted_count: Dict[ObjectId, int] = defaultdict(int)
+        inline_sub_dags_parameter = self.node.get_parameter_by_name_safe("_inline_sub_dags")
+        if inline_sub_dags_parameter and inline_sub_dags_parameter.value:
+            scheduled_subnodes = self._inline_sub_dags(self.subnodes, graph_id=None)
+        else:
+            scheduled_subnodes = self.subnodes
+
         self.node_id_to_node: Dict[ObjectId, Node] = {
-            node._id: node for node in self.subnodes
+            node._id: node for node in scheduled_subnodes
         }
 
         # number of dependencies to ids
         self.dependency_index_to_node_ids = defaultdict(set)
-        self.node_id_to_dependents = defaultdict(set)
+        # node id to its dependents and the number of references from each dependent to the node
+        self.node_id_to_dependents: Dict[ObjectId, Dict[ObjectId, int]] = defaultdict(lambda: defaultdict(int))
         self.node_id_to_dependency_index = defaultdict(lambda: 0)
         self.uncompleted_nodes_count = 0
 
         self._node_running_status = NodeRunningStatus.READY
+        self._abandoned = False
 
-        for subnode in self.subnodes:
+        for subnode in scheduled_subnodes:
             node_id = subnode._id
             if node_id == SpecialNodeId.INPUT:
                 updated_resources_count = 0
@@ -78,12 +112,10 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
             if NodeRunningStatus.is_finished(subnode.node_running_status) and node_id != SpecialNodeId.OUTPUT:
                 continue
             dependency_index = 0
-            for node_input in subnode.inputs:
-                for input_reference in node_input.input_references:
-                    dep_node_id = to_object_id(input_reference.node_id)
-                    self.node_id_to_dependents[dep_node_id].add(node_id)
-                    if not NodeRunningStatus.is_finished(self.node_id_to_node[dep_node_id].node_running_status):
-                        dependency_index += 1
+            for _, dep_node_id, _ in self._get_input_sources(subnode):
+                self.node_id_to_dependents[dep_node_id][node_id] += 1
+                if not NodeRunningStatus.is_finished(self.node_id_to_node[dep_node_id].node_running_status):
+                    dependency_index += 1
 
             if not NodeRunningStatus.is_finished(subnode.node_running_status):
                 self.uncompleted_nodes_count += 1
@@ -91,16 +123,146 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
             self.node_id_to_dependency_index[node_id] = dependency_index
 
         self.monitoring_executors: List[plynx.base.executor.BaseExecutor] = []
+        self._wake_up_event = threading.Event()
+
+        # Failed subnodes waiting to be relaunched: heap of (retry time, node id)
+        self.retry_queue: List[Tuple[float, ObjectId]] = []
+        # Failed subnodes that are IN_QUEUE, but not launched yet
+        self.pending_retry_node_ids: Set[ObjectId] = set()
+        self.node_id_to_num_failed_attempts: Dict[ObjectId, int] = defaultdict(int)
+        self.node_id_to_attempt_logs: Dict[ObjectId, List[Output]] = defaultdict(list)
+
+        # Maximum number of subnodes running at the same time, 0 means no limit
+        max_running_nodes_parameter = self.node.get_parameter_by_name_safe("_max_running_nodes")
+        self.max_running_nodes: int = int(max_running_nodes_parameter.value) if max_running_nodes_parameter else 0
+
+        self.node_id_to_priority: Dict[ObjectId, float] = {}
+        self._update_priorities()
+        self._init_inlined_graphs_statuses()
 
         if self.uncompleted_nodes_count == 0:
             self._node_running_status = NodeRunningStatus.SUCCESS
 
+    def _can_be_inlined(self, node: Node) -> bool:
+        if NodeRunningStatus.is_finished(node.node_running_status) or DAG._cacheable(node):
+            return False
+        executor_class = plynx.utils.plugin_manager.get_executor_manager().kind_to_executor_class.get(node.kind)
+        return isinstance(executor_class, type) and issubclass(executor_class, DAG) and executor_class.CAN_BE_INLINED
+
+    def _inline_sub_dags(self, subnodes: List[Node], graph_id: Optional[ObjectId]) -> List[Node]:
+        """Replace nested DAGs with their subnodes recursively.
+
+        Inlined DAG nodes stay in the graph of the run and report the aggregated status of their subnodes,
+        but the subnodes are scheduled by this DAG instead of a separate run.
+        References to the inner Input and Output nodes are resolved by `_resolve_reference`.
+
+        Return:
+            List of the nodes to schedule
+        """
+        res = []
+        sibling_node_ids = {subnode._id for subnode in subnodes}
+        for subnode in subnodes:
+            if graph_id is not None and subnode._id in {SpecialNodeId.INPUT, SpecialNodeId.OUTPUT}:
+                if subnode._id == SpecialNodeId.OUTPUT:
+                    self.inlined_graph_id_to_output_node[graph_id] = subnode
+                continue
+            self.node_id_to_graph_id[subnode._id] = graph_id
+            if self._can_be_inlined(subnode) and self._has_unique_inner_node_ids(subnode, sibling_node_ids):
+                self.inlined_graph_id_to_node[subnode._id] = subnode
+                res.extend(self._inline_sub_dags(subnode.get_sub_nodes(), graph_id=subnode._id))
+            else:
+                res.append(subnode)
+        return res
+
+    def _has_unique_inner_node_ids(self, node: Node, sibling_node_ids: Set[ObjectId]) -> bool:
+        """Check that the subnodes of the nested DAG do not collide with the nodes scheduled by this DAG.
+
+        Only the ID of the nested DAG node itself is regenerated when it is copied, so several instances of
+        the same nested DAG share the IDs of their subnodes. Such instances are not inlined and run separately.
+        """
+        inner_node_ids = {
+            subnode._id for subnode in node.get_sub_nodes() if subnode._id not in {SpecialNodeId.INPUT, SpecialNodeId.OUTPUT}
+        }
+        if inner_node_ids.isdisjoint(self.node_id_to_graph_id) and inner_node_ids.isdisjoint(sibling_node_ids):
+            return True
+        logging.warning(f"Nested DAG `{node.title}` ({node._id}) shares node IDs with another one, it will not be inlined")
+        return False
+
+    def _init_inlined_graphs_statuses(self):
+        """Count uncompleted subnodes of the inlined DAGs and complete the ones with nothing to run."""
+        for node_id, graph_id in self.node_id_to_graph_id.items():
+            if graph_id is None:
+                continue
+            if node_id in self.inlined_graph_id_to_node or not NodeRunningStatus.is_finished(self.node_id_to_node[node_id].node_running_status):
+                self.inlined_graph_id_to_uncompleted_count[graph_id] += 1
+        for graph_id in list(self.inlined_graph_id_to_node):
+            if self.inlined_graph_id_to_uncompleted_count[graph_id] == 0:
+                self.inlined_graph_id_to_uncompleted_count[graph_id] += 1
+                self._update_inlined_graph_status(graph_id, NodeRunningStatus.SUCCESS)
+
+    def _resolve_reference(self, graph_id: Optional[ObjectId], node_id: ObjectId, output_id: str) -> List[Tuple[ObjectId, str]]:
+        """Find the scheduled nodes and their outputs the reference points to.
+
+        Args:
+            graph_id    (ObjectId, None):   ID of the inlined DAG the reference belongs to, None if it is the top level
+            node_id     (ObjectId):         Node ID in the reference
+            output_id   (str):              Output name in the reference
+
+        Return:
+            List of (node_id, output_id) pairs
+        """
+        if graph_id is not None and node_id == SpecialNodeId.INPUT:
+            # Inner Input refers to the Inputs of the inlined DAG
+            input_references = self.inlined_graph_id_to_node[graph_id].get_input_by_name(output_id).input_references
+            graph_id = self.node_id_to_graph_id[graph_id]
+        elif node_id in self.inlined_graph_id_to_node:
+            # Outputs of the inlined DAG refer to its inner Output
+            input_references = self.inlined_graph_id_to_output_node[node_id].get_input_by_name(output_id).input_references
+            graph_id = node_id
+        else:
+            return [(node_id, output_id)]
+
+        res = []
+        for input_reference in input_references:
+            res.extend(self._resolve_reference(graph_id, to_object_id(input_reference.node_id), input_reference.output_id))
+        return res
+
+    def _get_input_sources(self, node: Node) -> Iterator[Tuple[Input, ObjectId, str]]:
+        """Iterate over the inputs of the node with the nodes and outputs they refer to."""
+        graph_id = self.node_id_to_graph_id.get(node._id)
+        for node_input in node.inputs:
+            for input_reference in node_input.input_references:
+                for dep_node_id, output_id in self._resolve_reference(graph_id, to_object_id(input_reference.node_id), input_reference.output_id):
+                    yield node_input, dep_node_id, output_id
+
+    def _update_inlined_graph_status(self, graph_id: Optional[ObjectId], node_running_status: str):
+        """Propagate the status of a subnode to the inlined DAGs it belongs to."""
+        while graph_id is not None:
+            graph_node = self.inlined_graph_id_to_node[graph_id]
+            if NodeRunningStatus.is_succeeded(node_running_status):
+                self.inlined_graph_id_to_uncompleted_count[graph_id] -= 1
+                if self.inlined_graph_id_to_uncompleted_count[graph_id] == 0:
+                    for output in graph_node.outputs:
+                        output.values = []
+                        for dep_node_id, output_id in self._resolve_reference(None, graph_id, output.name):
+                            output.values.extend(self.node_id_to_node[dep_node_id].get_output_by_name(output_id).values)
+                    node_running_status = NodeRunningStatus.SUCCESS
+                else:
+                    node_running_status = NodeRunningStatus.RUNNING
+            elif not NodeRunningStatus.is_failed(node_running_status):
+                node_running_status = NodeRunningStatus.RUNNING
+            if not NodeRunningStatus.is_failed(graph_node.node_running_status):
+                graph_node.node_running_status = node_running_status
+            graph_id = self.node_id_to_graph_id[graph_id]
+
     def finished(self) -> bool:
         """Return True or False depending on the running status of the DAG."""
+        if self._abandoned:
+            return True
         if self._node_running_status in _ACTIVE_WAITING_TO_STOP:
             # wait for the rest of the running jobs to finish
             # check running status of each of the nodes
-            for node in self.subnodes:
+            for node in self.node_id_to_node.values():
                 if node.node_running_status in _WAIT_STATUS_BEFORE_FAILED:
                     return False
 
@@ -110,54 +272,138 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
             return True
         return self._node_running_status in {NodeRunningStatus.SUCCESS, NodeRunningStatus.FAILED, NodeRunningStatus.CANCELED}
 
-    def pop_jobs(self) -> List[Node]:
-        """Get a set of nodes with satisfied dependencies"""
-        res: List[Node] = []
-        logging.info("Pop jobs")
+    def _update_priorities(self, node_id_to_run_time: Optional[Dict[ObjectId, float]] = None):
+        """Rank the subnodes by the longest remaining downstream path.
+
+        Every node on the path is weighted by its expected run time.
+        """
+        node_id_to_run_time = node_id_to_run_time or {}
+        node_id_to_dependencies = defaultdict(list)
+        for node_id, dependents in self.node_id_to_dependents.items():
+            for dependent_node_id in dependents:
+                node_id_to_dependencies[dependent_node_id].append(node_id)
+
+        # Traverse the graph from the sinks to the sources
+        node_id_to_num_unranked_dependents = {
+            node_id: len(self.node_id_to_dependents.get(node_id, {})) for node_id in self.node_id_to_node
+        }
+        node_ids_to_rank = deque(
+            node_id for node_id, num_unranked_dependents in node_id_to_num_unranked_dependents.items() if num_unranked_dependents == 0
+        )
+        self.node_id_to_priority = {}
+        while node_ids_to_rank:
+            node_id = node_ids_to_rank.popleft()
+            self.node_id_to_priority[node_id] = node_id_to_run_time.get(node_id, self.DEFAULT_NODE_RUN_TIME) + max(
+                (self.node_id_to_priority[dependent_node_id] for dependent_node_id in self.node_id_to_dependents.get(node_id, {})),
+                default=0,
+            )
+            for dependency_node_id in node_id_to_dependencies[node_id]:
+                node_id_to_num_unranked_dependents[dependency_node_id] -= 1
+                if node_id_to_num_unranked_dependents[dependency_node_id] == 0:
+                    node_ids_to_rank.append(dependency_node_id)
+
+    def _get_historical_run_times(self) -> Dict[ObjectId, float]:
+        """Get expected run time of the subnodes based on the previous runs of the same Operations"""
+        node_id_to_original_node_id = {
+            subnode._id: subnode.original_node_id
+            for subnode in self.node_id_to_node.values()
+            if subnode.original_node_id and subnode._id in self.node_id_to_dependency_index
+        }
+        try:
+            original_node_id_to_run_time = runs_collection_manager().get_average_run_times(
+                list(set(node_id_to_original_node_id.values()))
+            )
+        except Exception as err:    # pylint: disable=broad-except
+            logging.exception(f"Unable to get run time history: `{err}`")
+            return {}
+        return {
+            node_id: original_node_id_to_run_time[original_node_id]
+            for node_id, original_node_id in node_id_to_original_node_id.items()
+            if original_node_id in original_node_id_to_run_time
+        }
 
+    def _get_num_running_nodes(self) -> int:
+        return len(self.monitoring_executors)
+
+    def _pop_ready_node_ids(self) -> List[ObjectId]:
+        """Pop the ready nodes with the highest priority, but no more than `_max_running_nodes` allows"""
+        ready_node_ids = self.dependency_index_to_node_ids[0]
+        # Failed nodes are ready again when their backoff has passed
+        while self.retry_queue and self.retry_queue[0][0] <= time.time():
+            _, node_id = heapq.heappop(self.retry_queue)
+            ready_node_ids.add(node_id)
+        node_ids = sorted(ready_node_ids, key=lambda node_id: self.node_id_to_priority.get(node_id, 0), reverse=True)
+        if self.max_running_nodes > 0:
+            node_ids = node_ids[:max(0, self.max_running_nodes - self._get_num_running_nodes())]
+        ready_node_ids.difference_update(node_ids)
+        return node_ids
+
+    def _update_monitoring_executors(self):
+        """Sync the statuses of the monitored nodes and stop monitoring the finished ones."""
         finished_node_ids = set()
+        # Fetch statuses of all of the monitored nodes at once and only load the ones that have finished
+        node_id_to_status = runs_collection_manager().get_running_statuses(
+            [executor.node._id for executor in self.monitoring_executors]   # type: ignore
+        )
         for executor in self.monitoring_executors:
             assert executor.node, "executor node must be defined at this point"
+            node_running_status = node_id_to_status.get(executor.node._id)
+            if node_running_status == executor.node.node_running_status:
+                continue
+            if node_running_status is not None and not NodeRunningStatus.is_finished(node_running_status):
+                executor.node.node_running_status = node_running_status
+                continue
             running_status = executor.get_running_status()
 
             # check status
             if NodeRunningStatus.is_finished(running_status.node_running_status):
                 self.update_node(executor.node)
                 finished_node_ids.add(executor.node._id)
+                plynx.db.run_status_watcher.run_status_watcher().unsubscribe(executor.node._id, self._wake_up_event)
         self.monitoring_executors = [ex for ex in self.monitoring_executors if ex.node._id not in finished_node_ids]    # type: ignore
 
+    def pop_jobs(self) -> List[Node]:
+        """Get a set of nodes with satisfied dependencies"""
+        res: List[Node] = []
+        logging.info("Pop jobs")
+
+        self._update_monitoring_executors()
+
         if NodeRunningStatus.is_failed(self._node_running_status):
             logging.info("Job in DAG failed, pop_jobs will return []")
             return res
 
-        cached_nodes = []
-        for node_id in self.dependency_index_to_node_ids[0]:
-            # Get the node and init its inputs, i.e. filling its resource_ids
+        ready_nodes: List[Node] = []
+        for node_id in self._pop_ready_node_ids():
             orig_node = self.node_id_to_node[node_id]
-            for node_input in orig_node.inputs:
-                for input_reference in node_input.input_references:
-                    node_input.values.extend(
-                        self.node_id_to_node[to_object_id(input_reference.node_id)].get_output_by_name(
-                            input_reference.output_id
-                        ).values
-                    )
+            self._fill_inputs(orig_node)
+            self.pending_retry_node_ids.discard(node_id)
             orig_node.node_running_status = NodeRunningStatus.IN_QUEUE
-            node = orig_node.copy()   # type: ignore
-
-            if DAG._cacheable(node):
-                try:
-                    cache = node_cache_manager().get(node)
-                    if cache:
-                        node.node_running_status = NodeRunningStatus.RESTORED
-                        node.outputs = cache.outputs
-                        node.logs = cache.logs
-                        node.cache_url = f"/runs/{cache.run_id}?nid={cache.node_id}"
-                        cached_nodes.append(node)
-                        continue
-                except Exception as err:    # pylint: disable=broad-except
-                    logging.exception(f"Unable to update cache: `{err}`")
+            self._update_inlined_graph_status(self.node_id_to_graph_id.get(node_id), NodeRunningStatus.IN_QUEUE)
+            ready_nodes.append(orig_node.snapshot())
+
+        # Look up the cache of all of the ready nodes at once
+        cacheable_nodes = [node for node in ready_nodes if DAG._cacheable(node)]
+        node_id_to_cache = {}
+        if cacheable_nodes:
+            try:
+                node_id_to_cache = {
+                    node._id: cache for node, cache in zip(cacheable_nodes, node_cache_manager().get_many(cacheable_nodes)) if cache
+                }
+            except Exception as err:    # pylint: disable=broad-except
+                logging.exception(f"Unable to update cache: `{err}`")
+
+        cached_nodes = []
+        for node in ready_nodes:
+            cache = node_id_to_cache.get(node._id)
+            if cache:
+                node.node_running_status = NodeRunningStatus.RESTORED
+                node.outputs = cache.outputs
+                node.logs = cache.logs
+                node.cache_url = f"/runs/{cache.run_id}?nid={cache.node_id}"
+                cached_nodes.append(node)
+                continue
             res.append(node)
-        del self.dependency_index_to_node_ids[0]
 
         for node in cached_nodes:
             self.update_node(node)
@@ -166,6 +412,18 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
 
         return res
 
+    def _fill_inputs(self, node: Node):
+        """Init the inputs of the node, i.e. filling its resource_ids. Relaunched nodes have them already."""
+        if self.node_id_to_num_failed_attempts.get(node._id):
+            return
+        for node_input in node.inputs:
+            if node_input.input_references:
+                node_input.values = []
+        for node_input, dep_node_id, output_id in self._get_input_sources(node):
+            node_input.values.extend(
+                self.node_id_to_node[dep_node_id].get_output_by_name(output_id).values
+            )
+
     def update_node(self, node: Node):
         """
         Update node_running_status and outputs if the state has changed.
@@ -180,12 +438,66 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
         if dest_node.node_running_status == node.node_running_status:
             return
 
-        self._set_node_status(node._id, node.node_running_status)
+        if node.node_running_status == NodeRunningStatus.FAILED and self._schedule_retry(node):
+            return
+
         # TODO smarter copy
+        # Copy the outputs first, the inlined DAGs take their outputs from the subnodes when the status is set
         dest_node.parameters = node.parameters
         dest_node.logs = node.logs
         dest_node.outputs = node.outputs
         dest_node.cache_url = node.cache_url
+        dest_node.profile = node.profile
+        self._set_node_status(node._id, node.node_running_status)
+
+    def _schedule_retry(self, node: Node) -> bool:
+        """Put the failed node back on the queue if its retry policy allows it.
+
+        The logs of the failed attempts are kept in the node as `<log name>_attempt_<attempt>`.
+
+        Return:
+            (bool)  True if the node will be relaunched
+        """
+        if not self.RETRY_FAILED_NODES or NodeRunningStatus.is_failed(self._node_running_status):
+            return False
+        retries, retry_backoff = DAG._get_retry_policy(node)
+        num_failed_attempts = self.node_id_to_num_failed_attempts[node._id] + 1
+        if num_failed_attempts > retries:
+            return False
+        self.node_id_to_num_failed_attempts[node._id] = num_failed_attempts
+
+        attempt_logs = self.node_id_to_attempt_logs[node._id]
+        attempt_log_names = {log.name for log in attempt_logs}
+        logs = []
+        for log in node.logs:
+            if log.name in attempt_log_names:
+                continue
+            if log.values:
+                attempt_log = copy.copy(log)
+                attempt_log.name = f"{log.name}_attempt_{num_failed_attempts}"
+                attempt_logs.append(attempt_log)
+            log = copy.copy(log)
+            log.values = []
+            logs.append(log)
+
+        dest_node = self.node_id_to_node[node._id]
+        dest_node.logs = logs + attempt_logs
+        dest_node.node_running_status = NodeRunningStatus.IN_QUEUE
+        self.pending_retry_node_ids.add(node._id)
+
+        delay = retry_backoff * 2 ** (num_failed_attempts - 1)
+        heapq.heappush(self.retry_queue, (time.time() + delay, node._id))
+        logging.info(f"Node `{node.title}` failed, attempt {num_failed_attempts} of {retries + 1}. Relaunch in {delay} sec")
+        return True
+
+    def _cancel_pending_retries(self):
+        """Cancel the failed nodes waiting to be relaunched, otherwise the DAG would wait for them forever"""
+        self.retry_queue = []
+        for node_id in self.pending_retry_node_ids:
+            self.node_id_to_node[node_id].node_running_status = NodeRunningStatus.CANCELED
+            self.dependency_index_to_node_ids[0].discard(node_id)
+            self._update_inlined_graph_status(self.node_id_to_graph_id.get(node_id), NodeRunningStatus.CANCELED)
+        self.pending_retry_node_ids = set()
 
     def _set_node_status(self, node_id: ObjectId, node_running_status: str):
         node = self.node_id_to_node[node_id]
@@ -199,15 +511,8 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
             self._node_running_status = NodeRunningStatus.FAILED_WAITING
 
         if node_running_status in {NodeRunningStatus.SUCCESS, NodeRunningStatus.RESTORED}:
-            for dependent_node_id in self.node_id_to_dependents[node_id]:
-                dependent_node = self.node_id_to_node[dependent_node_id]
+            for dependent_node_id, removed_dependencies in self.node_id_to_dependents[node_id].items():
                 prev_dependency_index = self.node_id_to_dependency_index[dependent_node_id]
-
-                removed_dependencies = 0
-                for node_input in dependent_node.inputs:
-                    for input_reference in node_input.input_references:
-                        if to_object_id(input_reference.node_id) == to_object_id(node_id):
-                            removed_dependencies += 1
                 dependency_index = prev_dependency_index - removed_dependencies
 
                 self.dependency_index_to_node_ids[prev_dependency_index].remove(dependent_node_id)
@@ -215,6 +520,8 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
                 self.node_id_to_dependency_index[dependent_node_id] = dependency_index
             self.uncompleted_nodes_count -= 1
 
+        self._update_inlined_graph_status(self.node_id_to_graph_id.get(node_id), node_running_status)
+
         if self.uncompleted_nodes_count == 0 and not NodeRunningStatus.is_failed(self._node_running_status):
             self._node_running_status = NodeRunningStatus.SUCCESS
 
@@ -225,6 +532,16 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
                 return parameter.value
         return False
 
+    @staticmethod
+    def _get_retry_policy(node: Node) -> Tuple[int, float]:
+        """Get the number of retries and the initial backoff (sec) of the node"""
+        retries_parameter = node.get_parameter_by_name_safe("_retries")
+        retry_backoff_parameter = node.get_parameter_by_name_safe("_retry_backoff")
+        return (
+            int(retries_parameter.value) if retries_parameter else 0,
+            float(retry_backoff_parameter.value) if retry_backoff_parameter else 0.0,
+        )
+
     @classmethod
     def get_default_node(cls, is_workflow: bool) -> Node:
         node = super().get_default_node(is_workflow)
@@ -239,6 +556,27 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
                     removable=False,
                 )
             )
+            node.parameters.extend(plynx.plugins.executors.bases.get_retry_parameters())
+        node.parameters.append(
+            Parameter(
+                name="_inline_sub_dags",
+                parameter_type=ParameterTypes.BOOL,
+                value=False,
+                mutable_type=False,
+                publicable=False,
+                removable=False,
+            )
+        )
+        node.parameters.append(
+            Parameter(
+                name="_max_running_nodes",
+                parameter_type=ParameterTypes.INT,
+                value=0,
+                mutable_type=False,
+                publicable=False,
+                removable=False,
+            )
+        )
         node.parameters.append(
             Parameter(
                 name="_timeout",
@@ -259,18 +597,59 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
         node.author = self.node.author                                  # Change it to the author that runs it
 
         executor = plynx.utils.executor.materialize_executor(node)
+        plynx.db.run_status_watcher.run_status_watcher().subscribe(node._id, self._wake_up_event)
         executor.launch()
 
         self.monitoring_executors.append(executor)
 
+    def _resume_launched_nodes(self):
+        """Monitor the subnodes launched by the previous run of the DAG, i.e. before the DAG has been re-picked.
+
+        Launching them again would overwrite their runs.
+        """
+        node_ids = [
+            node_id for node_id, node in self.node_id_to_node.items()
+            if node.node_running_status in {NodeRunningStatus.IN_QUEUE, NodeRunningStatus.RUNNING}
+        ]
+        if not node_ids:
+            return
+        launched_node_ids = set(runs_collection_manager().get_running_statuses(node_ids))
+        for node_id in node_ids:
+            node = self.node_id_to_node[node_id]
+            if node_id not in launched_node_ids:
+                # The previous run stopped before the node was launched
+                node.node_running_status = NodeRunningStatus.READY
+                continue
+            logging.info(f"Resume monitoring of node `{node.title}` ({node_id})")
+            self.dependency_index_to_node_ids[0].discard(node_id)
+            executor = plynx.utils.executor.materialize_executor(node.snapshot())
+            plynx.db.run_status_watcher.run_status_watcher().subscribe(node_id, self._wake_up_event)
+            self.monitoring_executors.append(executor)
+
+    def _get_wait_timeout(self) -> float:
+        """Time until the next scheduled relaunch of a failed node, but no longer than the polling interval"""
+        timeout: float = self.GRAPH_ITERATION_SLEEP
+        if self.retry_queue:
+            timeout = max(0, min(timeout, self.retry_queue[0][0] - time.time()))
+        return timeout
+
+    def _wait_for_updates(self):
+        """Block until one of the monitored nodes is finished, a failed node is due to relaunch or the polling interval passes."""
+        self._wake_up_event.wait(timeout=self._get_wait_timeout())
+
     def run(self, preview: bool = False) -> str:
         assert self.node, "Attribute `node` is unassigned"
         if preview:
             raise Exception("`preview` is not supported for the DAG")
+        if self.USE_RUN_TIME_HISTORY:
+            self._update_priorities(self._get_historical_run_times())
+        self._resume_launched_nodes()
         while not self.finished():
+            # Clear before checking the statuses so that a notification received during `pop_jobs` is not lost
+            self._wake_up_event.clear()
             new_jobs = self.pop_jobs()
             if len(new_jobs) == 0:
-                time.sleep(self.GRAPH_ITERATION_SLEEP)
+                self._wait_for_updates()
                 continue
 
             for node in new_jobs:
@@ -298,8 +677,16 @@ class DAG(plynx.plugins.executors.bases.PLynxAsyncExecutor):
         The reason can be the fact it was working too long or parent exectuter canceled it.
         """
         self._node_running_status = NodeRunningStatus.CANCELED
+        self._cancel_pending_retries()
         for executor in self.monitoring_executors:
             executor.kill()
+        self._wake_up_event.set()
+
+    def abandon(self):
+        """Stop scheduling, but do not cancel the launched subnodes: the DAG that has re-picked the run monitors them."""
+        self._abandoned = True
+        self._node_running_status = NodeRunningStatus.CANCELED
+        self._wake_up_event.set()
 
     def validate(self, ignore_inputs: bool = True) -> Optional[ValidationError]:
         assert self.node, "Attribute `node` is unassigned"
@@ -1,22 +1,36 @@
 """Standard Executors that support running on local machine."""
+import concurrent.futures
+import io
 import logging
 import os
+import resource
+import shutil
 import signal
 import threading
+import time
 from abc import abstractmethod
 from collections import defaultdict
 from subprocess import Popen
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, BinaryIO, Dict, List, Optional, Type, Union
 
 import jinja2
 from past.builtins import basestring
 
 import plynx.plugins.executors.bases
 import plynx.utils.plugin_manager
+from plynx.base.resource import BaseResource
 from plynx.constants import NodeResources, NodeRunningStatus, ParameterTypes
 from plynx.db.node import Node, Output, Parameter, ParameterCode
 from plynx.plugins.resources.common import FILE_KIND
-from plynx.utils.file_handler import get_file_stream, upload_file_stream
+from plynx.utils.file_handler import SegmentedUpload, get_file_stream, upload_file_with_checksum
+from plynx.utils.resource_cache import get_resource_cache
+
+# Number of inputs downloaded concurrently
+INPUT_STAGING_POOL_SIZE = 8
+# Inputs are copied to the workdir in chunks of this size instead of being read into memory
+INPUT_STAGING_BUFFER_SIZE = 1024 * 1024
+# Number of outputs uploaded concurrently
+OUTPUT_UPLOAD_POOL_SIZE = 8
 
 
 def _resource_merger_func():
@@ -90,6 +104,26 @@ class _ResourceMerger:
         return self._dict
 
 
+class _CountingReader(io.RawIOBase):
+    """Count the bytes read from the stream"""
+
+    def __init__(self, stream: BinaryIO):
+        super().__init__()
+        self._stream = stream
+        self.num_bytes = 0
+
+    def readable(self) -> bool:
+        """The stream is readable"""
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        """Read the bytes of the wrapped stream into the buffer"""
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        self.num_bytes += len(data)
+        return len(data)
+
+
 class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
     """Base Executor that will use unix bash as a backend."""
     # pylint: disable=too-many-instance-attributes
@@ -97,7 +131,9 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
     def __init__(self, node: Optional[Node] = None):
         super().__init__(node)
         self.sp: Optional[Popen] = None
-        self.logs_sizes: Dict[str, int] = {}
+        # Resource usage of the finished script and its descendants
+        self._subprocess_rusage: Optional[resource.struct_rusage] = None
+        self.log_uploads: Dict[str, SegmentedUpload] = {}
         self.final_logs_uploaded = False
         self.logs: Dict[str, str] = {}
         self.logs_lock = threading.Lock()
@@ -135,7 +171,7 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
                     preexec_fn=pre_exec)
 
                 assert self.sp, "Popen object was not initialized"
-                self.sp.wait()
+                self._wait_for_subprocess()
 
             if self.sp.returncode:
                 raise Exception("Process returned non-zero value")
@@ -150,6 +186,16 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
 
         return self._node_running_status
 
+    def _wait_for_subprocess(self):
+        """Wait for the script and keep the resource usage of its process tree"""
+        assert self.sp, "Popen object was not initialized"
+        _, wait_status, self._subprocess_rusage = os.wait4(self.sp.pid, 0)
+        self.sp.returncode = os.waitstatus_to_exitcode(wait_status)
+
+    def get_subprocess_rusage(self) -> Optional[resource.struct_rusage]:
+        """Get the resource usage of the script, None if it has not finished"""
+        return self._subprocess_rusage
+
     def kill(self):
         if not hasattr(self, "sp") or not self.sp:
             return
@@ -217,6 +263,7 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
                 ),
             ]
         )
+        node.parameters.extend(plynx.plugins.executors.bases.get_retry_parameters())
         node.logs.extend(
             [
                 Output(
@@ -235,14 +282,45 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
         )
         return node
 
+    @staticmethod
+    def _download_input(value: str, filename: str) -> int:
+        """Download the resource.
+
+        Return:
+            (int)   Number of bytes
+        """
+        with get_file_stream(value) as src, open(filename, "wb") as dst:
+            shutil.copyfileobj(src, dst, INPUT_STAGING_BUFFER_SIZE)
+            return dst.tell()
+
+    @staticmethod
+    def _stage_input(value: str, filename: str, resource_class: Type[BaseResource]) -> int:
+        """Put the resource to the workdir, using the worker-local cache if it is enabled.
+
+        Without the cache, the resource class can extract the input directly from the storage stream.
+
+        Return:
+            (int)   Number of bytes read from the storage
+        """
+        resource_cache = get_resource_cache()
+        if resource_cache is not None:
+            return resource_cache.stage(value, filename, BaseBash._download_input)
+        # Do not open the stream twice for the resources that are always downloaded as is
+        if resource_class.stage_input is not BaseResource.stage_input:
+            with get_file_stream(value) as src:
+                counting_src = _CountingReader(src)
+                if resource_class.stage_input(counting_src, filename):   # type: ignore
+                    return counting_src.num_bytes
+        return BaseBash._download_input(value, filename)
+
     def _prepare_inputs(self, preview: bool = False):
         assert self.node, "Attribute `node` is undefined"
         resource_merger = _ResourceMerger(
             [NodeResources.INPUT],
             [input.name for input in self.node.inputs if input.is_array],
         )
-        for input in self.node.inputs:  # pylint: disable=redefined-builtin
-            if preview:
+        if preview:
+            for input in self.node.inputs:  # pylint: disable=redefined-builtin
                 for i, _ in enumerate(range(input.min_count)):
                     filename = os.path.join(self.workdir, f"i_{i}_{input.name}")
                     resource_merger.append(
@@ -250,16 +328,35 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
                         input.name,
                         input.is_array,
                     )
-            else:
-                for i, value in enumerate(input.values):
-                    filename = os.path.join(self.workdir, f"i_{i}_{input.name}")
-                    with open(filename, "wb") as f:
-                        f.write(get_file_stream(value).read())
-                    resource_merger.append(
-                        self._resource_manager.kind_to_resource_class[input.file_type].prepare_input(filename, preview),
-                        input.name,
-                        input.is_array,
-                    )
+            return resource_merger.get_dict()
+
+        staged_inputs = [
+            (input, os.path.join(self.workdir, f"i_{i}_{input.name}"), value)
+            for input in self.node.inputs
+            for i, value in enumerate(input.values)
+        ]
+        start_time = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=INPUT_STAGING_POOL_SIZE) as pool:
+            sizes = list(pool.map(
+                lambda staged_input: self._stage_input(
+                    staged_input[2],
+                    staged_input[1],
+                    self._resource_manager.kind_to_resource_class[staged_input[0].file_type],
+                ),
+                staged_inputs,
+            ))
+        staging_time = time.time() - start_time
+        logging.info(
+            f"Staged {len(staged_inputs)} inputs, {sum(sizes) / 2 ** 20:.1f} MiB in {staging_time:.2f} sec "
+            f"({sum(sizes) / 2 ** 20 / max(staging_time, 1e-6):.1f} MiB/sec)"
+        )
+
+        for input, filename, _ in staged_inputs:  # pylint: disable=redefined-builtin
+            resource_merger.append(
+                self._resource_manager.kind_to_resource_class[input.file_type].prepare_input(filename, preview),
+                input.name,
+                input.is_array,
+            )
         return resource_merger.get_dict()
 
     def _prepare_outputs(self, preview: bool = False):
@@ -284,7 +381,7 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
             for log in self.node.logs:
                 filename = os.path.join(self.workdir, f"l_{log.name}")
                 self.logs[log.name] = filename
-                self.logs_sizes[log.name] = 0
+                self.log_uploads[log.name] = SegmentedUpload()
             return self.logs
 
     def _get_script_fname(self, extension: str = ".sh"):
@@ -293,22 +390,29 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
     def _prepare_parameters(self):
         return prepare_parameters_for_python(self.node.parameters)
 
+    def _upload_output(self, key: str, filename: str):
+        """Postprocess the output file and upload it with its checksum"""
+        assert self.node, "Attribute `node` is undefined"
+        logging.info(f"Uploading output `{key}` - `{filename}`")
+        if not os.path.exists(filename):
+            raise IOError(f"Output `{key}` (filename: `{filename}`) does not exist")
+        matching_outputs = list(filter(lambda o: o.name == key, self.node.outputs))
+        assert len(matching_outputs) == 1, f"Found more that 1 output with the same name `{key}`"
+        output = matching_outputs[0]
+        filename = self._resource_manager.kind_to_resource_class[output.file_type].postprocess_output(filename)
+        resource_id, output.checksum = upload_file_with_checksum(filename)
+        output.values = [resource_id]
+        logging.info(output.to_dict())
+
     def _postprocess_outputs(self, outputs: Dict[str, str]):
         assert self.node, "Attribute `node` is undefined"
-        for key, filename in outputs.items():
-            logging.info(f"Uploading output `{key}` - `{filename}`")
-            if os.path.exists(filename):
-                logging.info("path exists")
-                matching_outputs = list(filter(lambda o: o.name == key, self.node.outputs))     # pylint: disable=cell-var-from-loop
-                assert len(matching_outputs) == 1, f"Found more that 1 output with the same name `{key}`"
-                filename = self._resource_manager.kind_to_resource_class[matching_outputs[0].file_type].postprocess_output(filename)
-                logging.info(filename)
-                with open(filename, "rb") as f:
-                    # resource_id
-                    self.node.get_output_by_name(key).values = [upload_file_stream(f)]
-                    logging.info(self.node.get_output_by_name(key).to_dict())
-            else:
-                raise IOError(f"Output `{key}` (filename: `{filename}`) does not exist")
+        start_time = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=OUTPUT_UPLOAD_POOL_SIZE) as pool:
+            futures = [pool.submit(self._upload_output, key, filename) for key, filename in outputs.items()]
+            for future in futures:
+                # Raise the first error
+                future.result()
+        logging.info(f"Uploaded {len(outputs)} outputs in {time.time() - start_time:.2f} sec")
 
     def _postprocess_logs(self) -> None:
         self.upload_logs(final=True)
@@ -324,7 +428,10 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
         raise TypeError("Process returned non-zero value")
 
     def upload_logs(self, final: bool = False) -> bool:
-        """Upload logs to the storage. When Final is False, only upload on update"""
+        """Upload logs to the storage. When Final is False, only upload on update.
+
+        Only the bytes appended since the previous upload are sent, see `SegmentedUpload`.
+        """
         assert self.node, "Attribute `node` is undefined"
         is_dirty = False
         with self.logs_lock:
@@ -332,17 +439,12 @@ class BaseBash(plynx.plugins.executors.bases.PLynxAsyncExecutorWithDirectory):
                 return is_dirty
             self.final_logs_uploaded = final
             for key, filename in self.logs.items():
-                if key not in self.logs_sizes:
+                if key not in self.log_uploads:
                     # the logs have not been initialized yet
                     continue
-                if os.path.exists(filename) and os.stat(filename).st_size != self.logs_sizes[key]:
+                if os.path.exists(filename) and self.log_uploads[key].upload(filename):
                     is_dirty = True
-                    log = self.node.get_log_by_name(key)
-                    self.logs_sizes[key] = os.stat(filename).st_size
-                    with open(filename, "rb") as f:
-                        # resource_id should be None if the file has not been uploaded yet
-                        # otherwise assign it
-                        log.values = [upload_file_stream(f, log.values[0] if len(log.values) > 0 else None)]
+                    self.node.get_log_by_name(key).values = [self.log_uploads[key].resource_id]
         return is_dirty
 
     @abstractmethod
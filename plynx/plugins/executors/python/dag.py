@@ -1,43 +1,213 @@
 """An executor for the DAGs based on python backend."""
+import asyncio
+import concurrent.futures
+import itertools
 import logging
-import multiprocessing
+import multiprocessing.pool
+import multiprocessing.queues
 import queue
+import threading
 import traceback
 import uuid
-from typing import List
+from collections import defaultdict
+from typing import Coroutine, Dict, Iterable, List, Optional, Tuple, Union
 
 import plynx.plugins.executors.dag
 import plynx.utils.executor
-from plynx.base.executor import RunningStatus
-from plynx.constants import NodeRunningStatus
-from plynx.db.node import Node
+from plynx.base.executor import BaseExecutor, RunningStatus
+from plynx.constants import PRIMITIVE_TYPES, NodeRunningStatus, ParameterTypes, SpecialNodeId
+from plynx.db.node import Node, Parameter, ParameterEnum
+from plynx.plugins.executors.python.input_cache import InputCache, InputCacheMode
+from plynx.plugins.executors.python.object_store import ObjectStore
 from plynx.utils import file_handler, node_utils
-from plynx.utils.common import to_object_id
+from plynx.utils.common import ObjectId, to_object_id
+from plynx.utils.profiler import ProfilingMode, profile_node
 
 POOL_SIZE = 3
-
-
-def worker_main(job_run_queue: queue.Queue, job_complete_queue: queue.Queue):
-    """Main threaded function that serves Operations."""
+# Memory limit of the cache of the deserialized inputs, bytes
+INPUT_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+
+class PoolBackend:
+    """Pools that execute the Operations of DAGParallel"""
+    THREAD: str = "thread"
+    PROCESS: str = "process"
+
+
+def get_in_memory_outputs_parameter() -> Parameter:
+    """Parameter that enables passing the outputs between the Operations in memory"""
+    return Parameter(
+        name="_in_memory_outputs",
+        parameter_type=ParameterTypes.BOOL,
+        value=False,
+        mutable_type=False,
+        publicable=True,
+        removable=False,
+    )
+
+
+def get_input_cache_parameter() -> Parameter:
+    """Parameter that defines how the deserialized inputs are cached and shared between the Operations"""
+    return Parameter(
+        name="_input_cache",
+        parameter_type=ParameterTypes.ENUM,
+        value=ParameterEnum(
+            values=[InputCacheMode.COPY, InputCacheMode.SHARED, InputCacheMode.OFF],
+            index=0,
+        ),
+        mutable_type=False,
+        publicable=True,
+        removable=False,
+    )
+
+
+def get_profiling_parameter() -> Parameter:
+    """Parameter that enables recording time and memory used by every Operation"""
+    return Parameter(
+        name="_profile",
+        parameter_type=ParameterTypes.ENUM,
+        value=ParameterEnum(
+            values=[ProfilingMode.OFF, ProfilingMode.RSS, ProfilingMode.TRACEMALLOC],
+            index=0,
+        ),
+        mutable_type=False,
+        publicable=True,
+        removable=False,
+    )
+
+
+def get_profiling_mode(dag: plynx.plugins.executors.dag.DAG) -> str:
+    """Get the ProfilingMode of the run"""
+    assert dag.node, "Attribute `node` is undefined"
+    parameter = dag.node.get_parameter_by_name_safe("_profile")
+    if not parameter:
+        return ProfilingMode.OFF
+    return parameter.value.values[parameter.value.index]
+
+
+def create_input_cache(dag: plynx.plugins.executors.dag.DAG) -> Optional[InputCache]:
+    """Create the InputCache of the run if it is enabled"""
+    assert dag.node, "Attribute `node` is undefined"
+    parameter = dag.node.get_parameter_by_name_safe("_input_cache")
+    if not parameter:
+        return None
+    mode = parameter.value.values[parameter.value.index]
+    if mode == InputCacheMode.OFF:
+        return None
+    return InputCache(max_size=INPUT_CACHE_MAX_SIZE, mode=mode)
+
+
+def create_object_store(dag: plynx.plugins.executors.dag.DAG) -> Optional[ObjectStore]:
+    """Create the ObjectStore for the outputs that are consumed only by the Operations of the DAG.
+
+    The outputs that go to the Output node or are not consumed at all are written to the storage by the Operations.
+    The outputs of the cacheable Operations are written too, the cache refers to them after the run.
+    Primitive values are stored in the nodes, so they do not need the store.
+    """
+    # pylint: disable=protected-access
+    assert dag.node, "Attribute `node` is undefined"
+    parameter = dag.node.get_parameter_by_name_safe("_in_memory_outputs")
+    if not parameter or not parameter.value:
+        return None
+    output_to_ref_count: Dict[Tuple[ObjectId, str], int] = defaultdict(int)
+    external_outputs = set()
+    for node in dag.node_id_to_node.values():
+        for _, dep_node_id, output_id in dag._get_input_sources(node):
+            if node._id == SpecialNodeId.OUTPUT:
+                external_outputs.add((dep_node_id, output_id))
+            else:
+                output_to_ref_count[(dep_node_id, output_id)] += 1
+
+    object_store = ObjectStore()
+    for (node_id, output_name), ref_count in output_to_ref_count.items():
+        node = dag.node_id_to_node[node_id]
+        if (node_id, output_name) in external_outputs or node.get_output_by_name(output_name).file_type in PRIMITIVE_TYPES:
+            continue
+        object_store.expect(node_id, output_name, ref_count, persist=plynx.plugins.executors.dag.DAG._cacheable(node))
+    return object_store
+
+
+def remove_object_ids(nodes: Iterable[Node]):
+    """Remove the values of the inputs and outputs that have been passed only in memory and do not exist in the storage"""
+    for node in nodes:
+        for node_input_or_output in itertools.chain(node.inputs, node.outputs):
+            node_input_or_output.values = [value for value in node_input_or_output.values if not ObjectStore.is_object_id(value)]
+
+
+class AsyncLane:
+    """Event loop in a separate thread. Coroutine Operations run on it concurrently instead of occupying pool workers."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule the coroutine on the event loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        """Stop the event loop"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _set_job_failed(node: Node, error_str: str):
+    """Mark the node as failed and save the traceback to its logs"""
+    logging.error(f"Job failed with traceback: {error_str}")
+    node.node_running_status = NodeRunningStatus.FAILED
+
+    err_filename = str(uuid.uuid4())
+    with file_handler.open(err_filename, "w") as f:
+        f.write(error_str)
+    output = node.get_log_by_name(name="traceback")
+    output.values = [err_filename]
+    logging.error(f"Wrote to logs: {err_filename}")
+
+
+async def _run_async_job(executor: BaseExecutor, node: Node, job_complete_queue: queue.Queue, profiling_mode: str):
+    try:
+        # The event loop thread is shared by the tasks, its CPU time does not belong to a single Operation
+        with profile_node(node, profiling_mode, measure_cpu_time=False):
+            await executor.run_async()  # type: ignore
+    except Exception:   # pylint: disable=broad-except
+        # Uploading the traceback blocks on the storage
+        await asyncio.to_thread(_set_job_failed, node, traceback.format_exc())
+    else:
+        node.node_running_status = NodeRunningStatus.SUCCESS
+    job_complete_queue.put(node)
+    logging.info(f"worker_main: added async node {node.title} on the job_complete_queue queue")
+
+
+# pylint: disable=too-many-arguments
+def worker_main(
+        job_run_queue: queue.Queue,
+        job_complete_queue: queue.Queue,
+        object_store: Optional[ObjectStore] = None,
+        input_cache: Optional[InputCache] = None,
+        async_lane: Optional[AsyncLane] = None,
+        profiling_mode: str = ProfilingMode.OFF,
+):
+    """Main threaded function that serves Operations.
+
+    Coroutine Operations are handed off to the `async_lane` if it is given.
+    """
     logging.info("Created pool worker")
     while True:
         node = job_run_queue.get()
         executor = plynx.utils.executor.materialize_executor(node)
+        if object_store is not None and hasattr(executor, "object_store"):
+            executor.object_store = object_store
+        if input_cache is not None and hasattr(executor, "input_cache"):
+            executor.input_cache = input_cache
 
         try:
-            # TODO support async executors
-            executor.launch()
+            if async_lane is not None and hasattr(executor, "is_async") and executor.is_async():
+                async_lane.submit(_run_async_job(executor, node, job_complete_queue, profiling_mode))
+                continue
+            with profile_node(node, profiling_mode):
+                executor.launch()
         except Exception:   # pylint: disable=broad-except
-            error_str = traceback.format_exc()
-            logging.error(f"Job failed with traceback: {error_str}")
-            node.node_running_status = NodeRunningStatus.FAILED
-
-            err_filename = str(uuid.uuid4())
-            with file_handler.open(err_filename, "w") as f:
-                f.write(error_str)
-            output = node.get_log_by_name(name="traceback")
-            output.values = [err_filename]
-            logging.error(f"Wrote to logs: {err_filename}")
+            _set_job_failed(node, traceback.format_exc())
         else:
             node.node_running_status = NodeRunningStatus.SUCCESS
         job_complete_queue.put(node)
@@ -52,61 +222,163 @@ class DAGParallel(plynx.plugins.executors.dag.DAG):
     Args:
         node_dict (dict)
     """
+    # pylint: disable=too-many-instance-attributes
+
     IS_GRAPH = True
-    GRAPH_ITERATION_SLEEP = 0
+    # Timeout of the blocking wait for the completed jobs
+    GRAPH_ITERATION_SLEEP = 1
+    # Python Operations are not stored in the runs collection
+    USE_RUN_TIME_HISTORY = False
+    CAN_BE_INLINED = False
 
     def __init__(self, node: Node):
         super().__init__(node)
+        assert self.node, "Attribute `node` is undefined"
+        self._num_running_nodes = 0
+        # Completed jobs received while waiting for updates
+        self._completed_nodes: List[Node] = []
+
+        pool_size_parameter = self.node.get_parameter_by_name_safe("_pool_size")
+        self.pool_size: int = max(1, int(pool_size_parameter.value)) if pool_size_parameter else POOL_SIZE
+        pool_backend_parameter = self.node.get_parameter_by_name_safe("_pool_backend")
+        if pool_backend_parameter:
+            pool_backend_enum = pool_backend_parameter.value
+            self.pool_backend: str = pool_backend_enum.values[pool_backend_enum.index]
+        else:
+            self.pool_backend = PoolBackend.THREAD
 
-        self.job_run_queue: queue.Queue = queue.Queue()
-        self.job_complete_queue: queue.Queue = queue.Queue()
+        # Processes exchange the nodes with the scheduler via pickling
+        if self.pool_backend == PoolBackend.PROCESS:
+            self.job_run_queue: Union[queue.Queue, multiprocessing.queues.Queue] = multiprocessing.Queue()
+            self.job_complete_queue: Union[queue.Queue, multiprocessing.queues.Queue] = multiprocessing.Queue()
+        else:
+            self.job_run_queue = queue.Queue()
+            self.job_complete_queue = queue.Queue()
+        self.worker_pool: Optional[multiprocessing.pool.Pool] = None
+
+        # Worker processes do not share memory with the scheduler
+        self.object_store = create_object_store(self) if self.pool_backend == PoolBackend.THREAD else None
+        self.input_cache = create_input_cache(self) if self.pool_backend == PoolBackend.THREAD else None
+        # Worker processes run the coroutine Operations with `asyncio.run()`
+        self.async_lane: Optional[AsyncLane] = None
 
+    def init_executor(self):
+        """Start the pool of workers"""
+        if self.worker_pool is not None:
+            return
+        if self.pool_backend == PoolBackend.PROCESS:
+            self.worker_pool = multiprocessing.pool.Pool(
+                self.pool_size, worker_main, (
+                    self.job_run_queue,
+                    self.job_complete_queue,
+                    None,
+                    None,
+                    None,
+                    get_profiling_mode(self),
+                )
+            )
+            return
+        self.async_lane = AsyncLane()
         self.worker_pool = multiprocessing.pool.ThreadPool(
-            POOL_SIZE, worker_main, (
+            self.pool_size, worker_main, (
                 self.job_run_queue,
                 self.job_complete_queue,
+                self.object_store,
+                self.input_cache,
+                self.async_lane,
+                get_profiling_mode(self),
             )
         )
 
+    def clean_up_executor(self):
+        """Stop the worker processes and the event loop. Threads are blocked on the queue and cannot be joined."""
+        if self.async_lane is not None:
+            self.async_lane.stop()
+            self.async_lane = None
+        if self.worker_pool is not None and self.pool_backend == PoolBackend.PROCESS:
+            self.worker_pool.terminate()
+            self.worker_pool = None
+
+    def run(self, preview: bool = False) -> str:
+        self.init_executor()
+        try:
+            return super().run(preview)
+        finally:
+            if self.object_store is not None:
+                remove_object_ids(self.node_id_to_node.values())
+
+    @classmethod
+    def get_default_node(cls, is_workflow: bool) -> Node:
+        node = super().get_default_node(is_workflow)
+        node.parameters.extend([
+            Parameter(
+                name="_pool_size",
+                parameter_type=ParameterTypes.INT,
+                value=POOL_SIZE,
+                mutable_type=False,
+                publicable=True,
+                removable=False,
+            ),
+            Parameter(
+                name="_pool_backend",
+                parameter_type=ParameterTypes.ENUM,
+                value=ParameterEnum(
+                    values=[PoolBackend.THREAD, PoolBackend.PROCESS],
+                    index=0,
+                ),
+                mutable_type=False,
+                publicable=True,
+                removable=False,
+            ),
+            get_in_memory_outputs_parameter(),
+            get_input_cache_parameter(),
+            get_profiling_parameter(),
+        ])
+        return node
+
     def pop_jobs(self) -> List[Node]:
         """Get a set of nodes with satisfied dependencies"""
         assert self.node, "Attribute `node` is undefined"
         res: List[Node] = []
 
-        num_completed_jobs = 0
-        while not self.job_complete_queue.empty():
+        completed_nodes, self._completed_nodes = self._completed_nodes, []
+        while True:
             try:
-                node = self.job_complete_queue.get_nowait()
-                logging.info(f"pop_jobs: run update {node.title}: start")
-                self.update_node(node)
-                logging.info(f"pop_jobs: run update {node.title}: finish")
-                num_completed_jobs += 1
+                completed_nodes.append(self.job_complete_queue.get_nowait())
             except queue.Empty:
-                logging.warning("Queue is empty")
                 break
+        for node in completed_nodes:
+            # In case something else is on the queue (i.e. canceled)
+            if not isinstance(node, Node):
+                continue
+            logging.info(f"pop_jobs: run update {node.title}")
+            self.update_node(node)
+            self._num_running_nodes -= 1
 
         if NodeRunningStatus.is_failed(self._node_running_status):
             if self._node_running_status != NodeRunningStatus.FAILED_WAITING:
                 logging.info(f"Job in DAG failed with status {self._node_running_status}, pop_jobs will return []")
             return res
 
-        for node_id in self.dependency_index_to_node_ids[0]:
-            # Get the node and init its inputs, i.e. filling its resource_ids
+        for node_id in self._pop_ready_node_ids():
             node = self.node_id_to_node[node_id]
-            for node_input in node.inputs:
-                for input_reference in node_input.input_references:
-                    node_input.values.extend(
-                        self.node_id_to_node[to_object_id(input_reference.node_id)].get_output_by_name(
-                            input_reference.output_id
-                        ).values
-                    )
+            self._fill_inputs(node)
             node.node_running_status = NodeRunningStatus.IN_QUEUE
 
             res.append(node)
-        del self.dependency_index_to_node_ids[0]
 
         return res
 
+    def _get_num_running_nodes(self) -> int:
+        return self._num_running_nodes
+
+    def _wait_for_updates(self):
+        """Block until a job is completed or the timeout passes"""
+        try:
+            self._completed_nodes.append(self.job_complete_queue.get(timeout=self._get_wait_timeout()))
+        except queue.Empty:
+            pass
+
     def _execute_node(self, node: Node):
         assert self.node, "Attribute `node` is undefined"
         if NodeRunningStatus.is_finished(node.node_running_status):     # NodeRunningStatus.SPECIAL
@@ -116,7 +388,8 @@ class DAGParallel(plynx.plugins.executors.dag.DAG):
         node.node_running_status = NodeRunningStatus.RUNNING
         # TODO somehow optimize `update_node`?
         # If not copy but original sent, the dependencies list won"t be updated
-        self.job_run_queue.put(node.copy())
+        self.job_run_queue.put(node.snapshot())
+        self._num_running_nodes += 1
 
     def kill(self):
         """Force to kill the process.
@@ -125,7 +398,10 @@ class DAGParallel(plynx.plugins.executors.dag.DAG):
         """
         logging.info("Received kill request")
         self._node_running_status = NodeRunningStatus.CANCELED
-        self.worker_pool.terminate()
+        # Wake up the scheduler
+        self.job_complete_queue.put(NodeRunningStatus.CANCELED)
+        if self.worker_pool is not None:
+            self.worker_pool.terminate()
 
     def finished(self) -> bool:
         """Return True or False depending on the running status of the DAG."""
@@ -136,12 +412,27 @@ class DAGParallel(plynx.plugins.executors.dag.DAG):
 class DAG(plynx.plugins.executors.dag.DAG):
     """Base Executor class"""
     IS_GRAPH: bool = True
+    CAN_BE_INLINED = False
+    # Subnodes are executed once in topological order
+    RETRY_FAILED_NODES = False
 
     def __init__(self, node: Node):
         super().__init__(node)
         self.job_run_queue: queue.Queue = queue.Queue()
         self.job_complete_queue: queue.Queue = queue.Queue()
         self.worker_pool = None
+        self.object_store = create_object_store(self)
+        self.input_cache = create_input_cache(self)
+
+    @classmethod
+    def get_default_node(cls, is_workflow: bool) -> Node:
+        node = super().get_default_node(is_workflow)
+        node.parameters.extend([
+            get_in_memory_outputs_parameter(),
+            get_input_cache_parameter(),
+            get_profiling_parameter(),
+        ])
+        return node
 
     def kill(self):
         """Force to kill the process.
@@ -159,6 +450,10 @@ class DAG(plynx.plugins.executors.dag.DAG):
             pool_size, worker_main, (
                 self.job_run_queue,
                 self.job_complete_queue,
+                self.object_store,
+                self.input_cache,
+                None,
+                get_profiling_mode(self),
             )
         )
 
@@ -194,7 +489,7 @@ class DAG(plynx.plugins.executors.dag.DAG):
             sub_node.node_running_status = NodeRunningStatus.RUNNING
 
             # Run
-            self.job_run_queue.put(sub_node.copy())
+            self.job_run_queue.put(sub_node.snapshot())
             new_node = self.job_complete_queue.get()
 
             # In case something else is on the queue (i.e. canceled)
@@ -206,6 +501,8 @@ class DAG(plynx.plugins.executors.dag.DAG):
                 self._node_running_status = prev_status
                 break
 
+        if self.object_store is not None:
+            remove_object_ids(self.node_id_to_node.values())
         if self._node_running_status == NodeRunningStatus.FAILED_WAITING:
             self._node_running_status = NodeRunningStatus.FAILED
         return self._node_running_status
@@ -223,7 +520,6 @@ class ExecutorWithWebWorkerServer(DAG):
     @staticmethod
     def fire_and_forget(url, json):
         """Fire and forget"""
-        import threading  # pylint: disable=import-outside-toplevel
         threading.Thread(target=ExecutorWithWebWorkerServer.request_task, args=(url, json)).start()
 
     def launch(self) -> RunningStatus:
@@ -0,0 +1,115 @@
+"""Cache of the deserialized inputs of python Operations"""
+import copy
+import pickle
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Tuple
+
+
+class InputCacheMode:
+    """How the cached inputs are passed to the Operations"""
+    OFF: str = "off"
+    # Every consumer gets its own copy, unpickled from the cached snapshot.
+    # Unpickling is faster than both parsing the json again and `copy.deepcopy`.
+    COPY: str = "copy"
+    # The same object is passed to every consumer, the Operations must not modify their inputs.
+    # Opt-in for the DAGs of read-only Operations, it saves the unpickling.
+    SHARED: str = "shared"
+
+
+def estimate_size(obj: Any) -> int:
+    """Approximate memory footprint of a deserialized object, i.e. parsed json"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_size(value) for value in obj)
+    return size
+
+
+class _Pickled:
+    """Snapshot of the cached value that every consumer unpickles to its own copy"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+class InputCache:
+    """LRU of the deserialized inputs keyed by resource id, bounded by the estimated memory size.
+
+    The same resource is often consumed by many Operations of a DAG. The cache makes sure it is read
+    from the storage and deserialized once per run.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, max_size: int, mode: str = InputCacheMode.COPY):
+        self.max_size = max_size
+        self.mode = mode
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._resource_id_to_value: Dict[str, Tuple[Any, int]] = OrderedDict()
+        self._resource_id_to_lock: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+    def _get(self, resource_id: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if resource_id not in self._resource_id_to_value:
+                return False, None
+            self._resource_id_to_value.move_to_end(resource_id)     # type: ignore
+            self.hits += 1
+            return True, self._resource_id_to_value[resource_id][0]
+
+    def _freeze(self, value: Any) -> Tuple[Any, int]:
+        """Get the value to be cached and its size"""
+        if self.mode == InputCacheMode.COPY:
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                return _Pickled(data), len(data)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                # Fall back to `copy.deepcopy`
+                pass
+        return value, estimate_size(value)
+
+    def _thaw(self, value: Any) -> Any:
+        """Get the copy of the cached value for a consumer"""
+        if isinstance(value, _Pickled):
+            return pickle.loads(value.data)
+        if self.mode == InputCacheMode.COPY:
+            return copy.deepcopy(value)
+        return value
+
+    def _put(self, resource_id: str, value: Any) -> Any:
+        """Cache the value.
+
+        Return:
+            (Any)   The value or its copy for the consumer that has loaded it
+        """
+        cached_value, value_size = self._freeze(value)
+        with self._lock:
+            self.misses += 1
+            self._resource_id_to_lock.pop(resource_id, None)
+            if value_size > self.max_size:
+                return value
+            self._resource_id_to_value[resource_id] = (cached_value, value_size)
+            self.size += value_size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._resource_id_to_value.popitem(last=False)  # type: ignore
+                self.size -= evicted_size
+        if cached_value is value:
+            return self._thaw(value)
+        return value
+
+    def get_or_load(self, resource_id: str, preprocess_input: Callable[[str], Any]) -> Any:
+        """Get the deserialized resource or load it with `preprocess_input`"""
+        found, value = self._get(resource_id)
+        if not found:
+            with self._lock:
+                resource_lock = self._resource_id_to_lock[resource_id]
+            with resource_lock:
+                found, value = self._get(resource_id)
+                if not found:
+                    return self._put(resource_id, preprocess_input(resource_id))
+        return self._thaw(value)
@@ -1,18 +1,27 @@
 """Python Operation"""
-import contextlib
+import asyncio
+import contextvars
+import functools
+import hashlib
 import inspect
-import os
+import logging
 import pydoc
+import shutil
 import sys
+import tempfile
 import threading
 import uuid
-from typing import Any, Callable, Dict
+from collections import defaultdict
+from typing import IO, Any, Callable, Dict, List, Optional, TextIO, Tuple
 
 import plynx.plugins.executors.bases
 import plynx.plugins.executors.local
 import plynx.utils.plugin_manager
 from plynx.constants import PRIMITIVE_TYPES, NodeRunningStatus, ParameterTypes
 from plynx.db.node import Input, Node, Output, Parameter, ParameterCode
+from plynx.plugins.executors.python.input_cache import InputCache
+from plynx.plugins.executors.python.object_store import ObjectStore
+from plynx.plugins.executors.python.stateful_registry import StatefulRegistry
 
 DEFAULT_CMD = """# Python Operation
 # The code of the operation have to be defined as a function
@@ -24,12 +33,32 @@ def operation(int_a, int_b):
     return {"sum": int_a + int_b}
 """
 
-stateful_init_mutex = threading.Lock()
-stateful_class_registry = {}
+# Maximum number of compiled `_cmd` functions kept in memory
+MATERIALIZED_CODE_CACHE_SIZE = 1024
+
+# Logs of an Operation are kept in memory up to this size (bytes) and then spill to disk
+LOG_SPILL_THRESHOLD = 1024 * 1024
+
+# Maximum number of instances of stateful Operations kept in memory
+STATEFUL_REGISTRY_CAPACITY = 16
+
+stateful_registry = StatefulRegistry(capacity=STATEFUL_REGISTRY_CAPACITY)
 
 _resource_manager = plynx.utils.plugin_manager.get_resource_manager()
 
 
+@functools.lru_cache(maxsize=MATERIALIZED_CODE_CACHE_SIZE)
+def _materialize_code(code: str) -> Callable:
+    """Compile the code of an Operation.
+
+    The result is cached since the same Operation is usually executed many times, i.e. in a map-style DAG.
+    Hits and misses are available via `_materialize_code.cache_info()`.
+    """
+    local_vars: Dict[str, Any] = {}
+    exec(code, globals(), local_vars)   # pylint: disable=W0122
+    return local_vars["operation"]
+
+
 def materialize_fn_or_cls(node: Node) -> Callable:
     """Unpickle the function"""
 
@@ -41,84 +70,158 @@ def materialize_fn_or_cls(node: Node) -> Callable:
         assert callable(func), f"The function or class `{code_function_location}` is not callable"
         return func
     elif code_parameter:
-        code = code_parameter.value.value
-        local_vars: Dict[str, Any] = {}
-        exec(code, globals(), local_vars)   # pylint: disable=W0122
-        return local_vars["operation"]
+        return _materialize_code(code_parameter.value.value)
     raise ValueError("No function to materialize")
 
 
-def assign_outputs(node: Node, output_dict: Dict[str, Any]):
+def get_stateful_key(node: Node) -> str:
+    """Key of the instance of a stateful Operation in the `stateful_registry`"""
+    if node.code_function_location:
+        return node.code_function_location
+    return hashlib.sha256(node.get_parameter_by_name("_cmd").value.value.encode("utf-8")).hexdigest()
+
+
+def warm_up_stateful_operations(code_function_locations: List[str]):
+    """Create the instances of stateful Operations in advance, i.e. when the worker starts"""
+    for code_function_location in code_function_locations:
+        cls = pydoc.locate(code_function_location)
+        if not inspect.isclass(cls):
+            raise ValueError(f"`{code_function_location}` is not a class")
+        logging.info(f"Warming up `{code_function_location}`")
+        stateful_registry.get_or_create(code_function_location, cls)   # type: ignore
+
+
+def assign_outputs(node: Node, output_dict: Dict[str, Any], object_store: Optional[ObjectStore] = None):
     """Apply output_dict to node"s outputs."""
     if not output_dict:
         return
     for key, value in output_dict.items():
         node_output = node.get_output_by_name(key)
-        func = _resource_manager.kind_to_resource_class[node_output.file_type].postprocess_output
+        postprocess_output = _resource_manager.kind_to_resource_class[node_output.file_type].postprocess_output
+        if object_store is not None and object_store.is_expected(node._id, key):
+            func = functools.partial(object_store.put, node._id, key, postprocess_output)
+        else:
+            func = postprocess_output
         if node_output.is_array:
             node_output.values = list(map(func, value))
         else:
             node_output.values = [func(value)]
 
 
-class redirect_to_plynx_logs:   # pylint: disable=invalid-name
-    """Redirect stdout and stderr to standard PLynx Outputs"""
-    # pylint: disable=too-many-instance-attributes
+class _ContextLocalStream:
+    """Stream that sends the output of the threads and asyncio tasks capturing their logs to their own buffers.
 
-    def __init__(self, node: Node, stdout: str, stderr: str):
-        self.stdout_filename = str(uuid.uuid4())
-        self.stderr_filename = str(uuid.uuid4())
+    The rest of the output goes to the original stream.
+    """
 
-        self.stdout = stdout
-        self.stderr = stderr
+    def __init__(self, default_stream: TextIO, name: str):
+        self.default_stream = default_stream
+        self._stream: contextvars.ContextVar[Optional[TextIO]] = contextvars.ContextVar(f"plynx_{name}", default=None)
 
-        self.node = node
+    def get_stream(self) -> TextIO:
+        """Get the stream of the current context"""
+        return self._stream.get() or self.default_stream
 
-        self.names_map = [
-            (self.stdout_filename, self.stdout),
-            (self.stderr_filename, self.stderr),
-        ]
+    def set_stream(self, stream: Optional[TextIO]) -> Optional[TextIO]:
+        """Capture the output of the current context. Use None to stop capturing.
 
-        self.stdout_file = None
-        self.stderr_file = None
+        Return:
+            The previous stream of the current context
+        """
+        prev_stream = self._stream.get()
+        self._stream.set(stream)
+        return prev_stream
 
-        self.stdout_redirect = None
-        self.stderr_redirect = None
+    def write(self, data: str) -> int:
+        """Write to the stream of the current context"""
+        return self.get_stream().write(data)
 
-    def __enter__(self):
-        self.stdout_file = open(self.stdout_filename, "w")
-        self.stderr_file = open(self.stderr_filename, "w")
+    def flush(self):
+        """Flush the stream of the current context"""
+        self.get_stream().flush()
 
-        self.stdout_redirect = contextlib.redirect_stdout(self.stdout_file)
-        self.stderr_redirect = contextlib.redirect_stderr(self.stderr_file)
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.default_stream, name)
 
-        self.stdout_redirect.__enter__()
-        self.stderr_redirect.__enter__()
 
-    def __exit__(self, *args):
+_context_local_streams_lock = threading.Lock()
 
-        self.stdout_redirect.__exit__(*sys.exc_info())
-        self.stderr_redirect.__exit__(*sys.exc_info())
 
-        self.stdout_file.close()
-        self.stderr_file.close()
+def _get_context_local_stream(name: str) -> _ContextLocalStream:
+    """Get `sys.stdout` or `sys.stderr` wrapped with _ContextLocalStream"""
+    with _context_local_streams_lock:
+        stream = getattr(sys, name)
+        if not isinstance(stream, _ContextLocalStream):
+            stream = _ContextLocalStream(stream, name)
+            setattr(sys, name, stream)
+        return stream
 
-        for filename, logs_name in self.names_map:
-            if os.stat(filename).st_size > 0:
+
+class redirect_to_plynx_logs:   # pylint: disable=invalid-name
+    """Redirect stdout and stderr of the current thread or asyncio task to standard PLynx Outputs.
+
+    Unlike `contextlib.redirect_stdout`, it is safe to use in concurrent threads and tasks.
+    The logs are kept in memory, spill to disk if they are larger than LOG_SPILL_THRESHOLD,
+    and are uploaded to the storage at once. Use `async with` on the event loop, so that the upload does not block it.
+    """
+
+    def __init__(self, node: Node, stdout: str, stderr: str):
+        self.node = node
+        self.names_map = [
+            ("stdout", stdout),
+            ("stderr", stderr),
+        ]
+        self.buffers: Dict[str, IO[str]] = {}
+        self.prev_streams: Dict[str, Optional[TextIO]] = {}
+
+    def __enter__(self):
+        for stream_name, _ in self.names_map:
+            self.buffers[stream_name] = tempfile.SpooledTemporaryFile(max_size=LOG_SPILL_THRESHOLD, mode="w+")  # pylint: disable=consider-using-with
+            self.prev_streams[stream_name] = _get_context_local_stream(stream_name).set_stream(self.buffers[stream_name])   # type: ignore
+
+    def __exit__(self, *args):
+        self._restore_streams()
+        self._upload_logs()
+
+    async def __aenter__(self):
+        self.__enter__()
+
+    async def __aexit__(self, *args):
+        self._restore_streams()
+        await asyncio.to_thread(self._upload_logs)
+
+    def _restore_streams(self):
+        for stream_name, _ in self.names_map:
+            _get_context_local_stream(stream_name).set_stream(self.prev_streams[stream_name])
+
+    def _upload_logs(self):
+        for stream_name, logs_name in self.names_map:
+            with self.buffers[stream_name] as buffer:
+                if buffer.tell() == 0:
+                    continue
+                buffer.seek(0)
+                filename = str(uuid.uuid4())
                 with plynx.utils.file_handler.open(filename, "w") as f:
-                    with open(filename) as fi:
-                        f.write(fi.read())
+                    shutil.copyfileobj(buffer, f)
                 output = self.node.get_log_by_name(name=logs_name)
                 output.values = [filename]
-            else:
-                os.remove(filename)
 
 
-def prep_args(node: Node) -> Dict[str, Any]:
+def prep_args(node: Node, object_store: Optional[ObjectStore] = None, input_cache: Optional[InputCache] = None) -> Dict[str, Any]:
     """Pythonize inputs and parameters"""
     args = {}
     for input in node.inputs:   # pylint: disable=redefined-builtin
-        func = _resource_manager.kind_to_resource_class[input.file_type].preprocess_input
+        preprocess_input = _resource_manager.kind_to_resource_class[input.file_type].preprocess_input
+        # Primitive values are stored in the Node, there is nothing to cache
+        use_input_cache = input_cache is not None and input.file_type not in PRIMITIVE_TYPES
+
+        def func(value, preprocess_input=preprocess_input, use_input_cache=use_input_cache):
+            if object_store is not None and value in object_store:
+                return object_store.get(value)
+            if use_input_cache:
+                return input_cache.get_or_load(value, preprocess_input)     # type: ignore
+            return preprocess_input(value)
+
         if input.is_array:
             args[input.name] = list(map(func, input.values))
         else:
@@ -137,25 +240,119 @@ def prep_args(node: Node) -> Dict[str, Any]:
     return args
 
 
+def _split_into_batches(args: Dict[str, Any], map_input: str, batch_size: int) -> List[List[Any]]:
+    values = args[map_input]
+    if not isinstance(values, list):
+        raise ValueError(f"Input `{map_input}` is not an array and cannot be mapped")
+    if batch_size <= 0:
+        batch_size = max(1, len(values))
+    return [values[start:start + batch_size] for start in range(0, len(values), batch_size)]
+
+
+def _concat_batch_outputs(batches: List[List[Any]], batch_results: List[Optional[Dict[str, List[Any]]]]) -> Dict[str, List[Any]]:
+    res: Dict[str, List[Any]] = defaultdict(list)
+    for batch, batch_res in zip(batches, batch_results):
+        for key, batch_output in (batch_res or {}).items():
+            if len(batch_output) != len(batch):
+                raise ValueError(f"Output `{key}` has {len(batch_output)} values for the batch of {len(batch)}")
+            res[key].extend(batch_output)
+    return res
+
+
+def call_in_batches(func: Callable, args: Dict[str, Any], map_input: str, batch_size: int) -> Dict[str, List[Any]]:
+    """Call the operation once per batch of the values of `map_input` and concatenate the outputs.
+
+    The operation gets a list of at most `batch_size` values, i.e. it can wrap the list with `numpy.asarray`.
+    It must return lists of the same length, i.e. `{"out": [x + 1 for x in batch]}`.
+    Non-positive `batch_size` means a single batch.
+    """
+    batches = _split_into_batches(args, map_input, batch_size)
+    return _concat_batch_outputs(batches, [func(**{**args, map_input: batch}) for batch in batches])
+
+
+async def call_in_batches_async(func: Callable, args: Dict[str, Any], map_input: str, batch_size: int) -> Dict[str, List[Any]]:
+    """Coroutine version of `call_in_batches`. The batches are awaited concurrently."""
+    batches = _split_into_batches(args, map_input, batch_size)
+    batch_results = await asyncio.gather(*(func(**{**args, map_input: batch}) for batch in batches))
+    return _concat_batch_outputs(batches, list(batch_results))
+
+
 class PythonNode(plynx.plugins.executors.bases.PLynxSyncExecutor):
     """
     Class is used as a placeholder for local python executor
     """
 
-    def run(self, preview: bool = False) -> str:
+    def __init__(self, node: Optional[Node] = None):
+        super().__init__(node)
+        # Set by the in-process DAG to pass the outputs in memory
+        self.object_store: Optional[ObjectStore] = None
+        # Set by the in-process DAG to deserialize every resource once per run
+        self.input_cache: Optional[InputCache] = None
+
+    def _materialize_operation(self) -> Callable:
+        """Get the function or the instance of the stateful Operation"""
         assert self.node, "Executor memeber `node` is not defined"
         func = materialize_fn_or_cls(self.node)
         if inspect.isclass(func):
-            with stateful_init_mutex:
-                if self.node.code_hash not in stateful_class_registry:
-                    with redirect_to_plynx_logs(self.node, "init_stdout", "init_stderr"):
-                        stateful_class_registry[self.node.code_hash] = func()
-                func = stateful_class_registry[self.node.code_hash]
+            def init_stateful_operation():
+                with redirect_to_plynx_logs(self.node, "init_stdout", "init_stderr"):
+                    return func()
+            func = stateful_registry.get_or_create(get_stateful_key(self.node), init_stateful_operation)
+        return func
+
+    def is_async(self) -> bool:
+        """Check if the Operation is a coroutine function that can run on the event loop"""
+        assert self.node, "Executor memeber `node` is not defined"
+        func = materialize_fn_or_cls(self.node)
+        if inspect.isclass(func):
+            return inspect.iscoroutinefunction(getattr(func, "__call__", None))
+        return inspect.iscoroutinefunction(func)
+
+    def _get_map_mode(self) -> Tuple[Optional[str], int]:
+        """Get the name of the mapped input, None if the map mode is off, and the batch size"""
+        assert self.node, "Executor memeber `node` is not defined"
+        map_input_parameter = self.node.get_parameter_by_name_safe("_map_input")
+        if not map_input_parameter or not map_input_parameter.value:
+            return None, 0
+        batch_size_parameter = self.node.get_parameter_by_name_safe("_batch_size")
+        return map_input_parameter.value, int(batch_size_parameter.value) if batch_size_parameter else 0
+
+    def run(self, preview: bool = False) -> str:
+        assert self.node, "Executor memeber `node` is not defined"
+        if self.is_async():
+            return asyncio.run(self.run_async(preview))
+        func = self._materialize_operation()
 
+        map_input, batch_size = self._get_map_mode()
         with redirect_to_plynx_logs(self.node, "stdout", "stderr"):
-            res = func(**prep_args(self.node))
+            args = prep_args(self.node, self.object_store, self.input_cache)
+            if map_input:
+                res = call_in_batches(func, args, map_input=map_input, batch_size=batch_size)
+            else:
+                res = func(**args)
+
+        assign_outputs(self.node, res, self.object_store)
+
+        return NodeRunningStatus.SUCCESS
+
+    async def run_async(self, preview: bool = False) -> str:     # pylint: disable=unused-argument
+        """Run the coroutine Operation on the current event loop.
 
-        assign_outputs(self.node, res)
+        Only the Operation itself runs on the loop, reading the inputs and writing the outputs and the logs
+        block on the storage and go to the threads.
+        """
+        assert self.node, "Executor memeber `node` is not defined"
+        func = await asyncio.to_thread(self._materialize_operation)
+
+        map_input, batch_size = self._get_map_mode()
+        async with redirect_to_plynx_logs(self.node, "stdout", "stderr"):
+            args = await asyncio.to_thread(prep_args, self.node, self.object_store, self.input_cache)
+            if map_input:
+                res = await call_in_batches_async(func, args, map_input=map_input, batch_size=batch_size)
+            else:
+                res = await func(**args)
+
+        await asyncio.to_thread(assign_outputs, self.node, res, self.object_store)
 
         return NodeRunningStatus.SUCCESS
 
@@ -201,6 +398,23 @@ class PythonNode(plynx.plugins.executors.bases.PLynxSyncExecutor):
                     publicable=False,
                     removable=False,
                 ),
+                # Map mode: call the operation in batches of the values of the array input
+                Parameter(
+                    name="_map_input",
+                    parameter_type=ParameterTypes.STR,
+                    value="",
+                    mutable_type=False,
+                    publicable=False,
+                    removable=False,
+                ),
+                Parameter(
+                    name="_batch_size",
+                    parameter_type=ParameterTypes.INT,
+                    value=0,
+                    mutable_type=False,
+                    publicable=False,
+                    removable=False,
+                ),
             ]
         )
         return node
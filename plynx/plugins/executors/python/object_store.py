@@ -0,0 +1,78 @@
+"""In-memory store of the python objects passed between Operations of the same DAG"""
+import threading
+import uuid
+from typing import Any, Callable, Dict, Tuple
+
+from plynx.utils.common import ObjectId, to_object_id
+
+OBJECT_ID_PREFIX = "object_store:"
+
+
+class ObjectStore:
+    """Reference-counted store of the outputs of python Operations.
+
+    The DAG declares which outputs are consumed only inside the run and by how many inputs with `expect()`.
+    Such outputs are kept in memory instead of being serialized to the storage: the output value becomes
+    an object id, and the object is deleted after every consumer has read it with `get()`.
+
+    The outputs that are needed outside of the run, i.e. by the cache, are expected with `persist=True`.
+    They are written to the storage as usual and the consumers still get them from memory by the resource id.
+
+    The objects are shared between the consumers, so the Operations should not modify their inputs.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (node_id, output_name) -> (ref_count, persist)
+        self._output_to_expectation: Dict[Tuple[ObjectId, str], Tuple[int, bool]] = {}
+        self._object_id_to_object: Dict[str, Any] = {}
+        self._object_id_to_ref_count: Dict[str, int] = {}
+
+    def expect(self, node_id: ObjectId, output_name: str, ref_count: int, persist: bool = False):
+        """Keep the output of the node in memory for `ref_count` consumers. Write it to the storage if `persist`."""
+        with self._lock:
+            self._output_to_expectation[(to_object_id(node_id), output_name)] = (ref_count, persist)
+
+    def is_expected(self, node_id: ObjectId, output_name: str) -> bool:
+        """Check if the output should be kept in memory"""
+        with self._lock:
+            return (to_object_id(node_id), output_name) in self._output_to_expectation
+
+    def put(self, node_id: ObjectId, output_name: str, postprocess_output: Callable[[Any], str], obj: Any) -> str:
+        """Put a value of the output to the store. Persisted outputs are written with `postprocess_output`.
+
+        Return:
+            (str)   Object id that replaces the resource id in the output values, resource id if persisted
+        """
+        with self._lock:
+            ref_count, persist = self._output_to_expectation[(to_object_id(node_id), output_name)]
+        object_id = postprocess_output(obj) if persist else f"{OBJECT_ID_PREFIX}{uuid.uuid4()}"
+        with self._lock:
+            self._object_id_to_object[object_id] = obj
+            self._object_id_to_ref_count[object_id] = self._object_id_to_ref_count.get(object_id, 0) + ref_count
+        return object_id
+
+    def get(self, object_id: str) -> Any:
+        """Get the object and release the reference to it"""
+        with self._lock:
+            obj = self._object_id_to_object[object_id]
+            self._object_id_to_ref_count[object_id] -= 1
+            if self._object_id_to_ref_count[object_id] <= 0:
+                del self._object_id_to_object[object_id]
+                del self._object_id_to_ref_count[object_id]
+        return obj
+
+    def __contains__(self, value: Any) -> bool:
+        """Check if the value of the input is in memory"""
+        if not isinstance(value, str):
+            return False
+        with self._lock:
+            return value in self._object_id_to_object
+
+    def __len__(self) -> int:
+        return len(self._object_id_to_object)
+
+    @staticmethod
+    def is_object_id(value: Any) -> bool:
+        """Check if the value refers to an object that has not been written to the storage"""
+        return isinstance(value, str) and value.startswith(OBJECT_ID_PREFIX)
@@ -0,0 +1,50 @@
+"""Registry of the instances of stateful python Operations"""
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict
+
+
+class StatefulRegistry:
+    """Bounded LRU of the instances of stateful Operations, i.e. classes that load a model in `__init__`.
+
+    Every instance is created once per key. The creation holds the lock of the key only,
+    so a slow initialization does not block the other stateful Operations.
+    The least recently used instances are dropped when the number of instances exceeds `capacity`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._key_to_instance: Dict[str, Any] = OrderedDict()
+        self._key_to_lock: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+    def _get(self, key: str) -> Any:
+        """Get the instance and mark it as recently used. Must be called under the lock."""
+        self._key_to_instance.move_to_end(key)     # type: ignore
+        return self._key_to_instance[key]
+
+    def get_or_create(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Get the instance by key or create it with `factory()`"""
+        with self._lock:
+            if key in self._key_to_instance:
+                return self._get(key)
+            key_lock = self._key_to_lock[key]
+
+        with key_lock:
+            with self._lock:
+                if key in self._key_to_instance:
+                    return self._get(key)
+            instance = factory()
+            with self._lock:
+                self._key_to_instance[key] = instance
+                while len(self._key_to_instance) > self.capacity:
+                    evicted_key, _ = self._key_to_instance.popitem(last=False)     # type: ignore
+                    self._key_to_lock.pop(evicted_key, None)
+        return instance
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._key_to_instance
+
+    def __len__(self) -> int:
+        return len(self._key_to_instance)
@@ -3,13 +3,12 @@
 import json
 import os
 import stat
-import zipfile
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional
 
 from plynx.base import resource
 from plynx.constants import NodeResources
-from plynx.utils.common import zipdir
-from plynx.utils.config import WebConfig, get_web_config
+from plynx.utils.archive import extract_file, extract_stream, list_archive, pack_directory
+from plynx.utils.config import WebConfig, get_storage_config, get_web_config
 
 WEB_CONFIG: WebConfig = get_web_config()
 
@@ -135,17 +134,31 @@ class Executable(resource.BaseResource):
 
 
 class Directory(resource.BaseResource):
-    """Directory file, i.e. zipfile"""
+    """Directory packed into an archive, see `DirectoryCodec`.
+
+    The codec of the new outputs is defined by `storage.directory_codec` in the config.
+    The inputs are extracted by the format of the archive, so that the codec can be changed at any time.
+    """
+    @staticmethod
+    def stage_input(stream: BinaryIO, filename: str) -> bool:
+        """Extract tar archive while it is being downloaded. Zip archive is saved as is and extracted by `prepare_input`.
+
+        Return:
+            (bool)  Always True, the input is staged from the stream in both cases
+        """
+        extract_stream(stream, filename)
+        return True
+
     @staticmethod
     def prepare_input(filename, preview: bool = False) -> Dict[str, str]:
-        """Extract zip file"""
-        if preview:
+        """Extract the archive"""
+        if preview or os.path.isdir(filename):
+            # Already extracted by `stage_input`
             return {NodeResources.INPUT: filename}
-        zip_filename = f"{filename}.zip"
-        os.rename(filename, zip_filename)
-        os.mkdir(filename)
-        with zipfile.ZipFile(zip_filename) as zf:
-            zf.extractall(filename)
+        archive_filename = f"{filename}.archive"
+        os.rename(filename, archive_filename)
+        extract_file(archive_filename, filename)
+        os.remove(archive_filename)
         return {NodeResources.INPUT: filename}
 
     @staticmethod
@@ -158,17 +171,13 @@ class Directory(resource.BaseResource):
 
     @staticmethod
     def postprocess_output(value: str) -> str:
-        """Compress folder to a zip file"""
-        zip_filename = f"{value}.zip"
-        with zipfile.ZipFile(zip_filename, "w", zipfile.ZIP_DEFLATED) as zf:
-            zipdir(value, zf)
-        return zip_filename
+        """Pack folder to an archive"""
+        return pack_directory(value, get_storage_config().directory_codec)
 
     @classmethod
     def preview(cls, preview_object: resource.PreviewObject) -> str:
         """Generate preview html body"""
-        with zipfile.ZipFile(preview_object.fp, "r") as zf:
-            content_stream = "\n".join(zf.namelist())
+        content_stream = "\n".join(list_archive(preview_object.fp))
 
         return f"<pre>{content_stream}</pre>"
 
@@ -0,0 +1,44 @@
+"""Per-Operation report of the profiled runs"""
+import csv
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+import dateutil.parser
+
+from plynx.constants import Collections
+from plynx.db.node import Node
+from plynx.db.node_collection_manager import NodeCollectionManager
+from plynx.utils.common import ObjectId
+from plynx.utils.profiler import OperationProfile, aggregate_profiles
+
+runs_collection_manager: NodeCollectionManager = NodeCollectionManager(collection=Collections.RUNS)
+
+
+def _traverse_nodes(node: Node) -> Iterator[Node]:
+    """Yield the node and all of its subnodes recursively"""
+    yield node
+    sub_nodes_parameter = node.get_parameter_by_name_safe("_nodes")
+    if sub_nodes_parameter:
+        for sub_node in sub_nodes_parameter.value.value:
+            yield from _traverse_nodes(sub_node)
+
+
+def run_profile(start_datetime: Optional[str], end_datetime: Optional[str]):
+    """Print the time and memory used by the Operations in csv format.
+
+    The Operations are profiled by the workers with `--profiling` or by python DAGs with `_profile` parameter.
+    """
+    start_datetime_parsed = dateutil.parser.parse(start_datetime) if start_datetime else None
+    end_datetime_parsed = dateutil.parser.parse(end_datetime) if end_datetime else datetime.now()
+
+    # Subnodes of the DAGs are also stored as separate runs, count every one of them once
+    node_id_to_node: Dict[ObjectId, Node] = {}
+    for run_dict in runs_collection_manager.get_finished_runs(start_datetime_parsed, end_datetime_parsed):
+        for node in _traverse_nodes(Node.from_dict(run_dict)):
+            node_id_to_node[node._id] = node
+
+    file_writer = csv.writer(sys.stdout)
+    file_writer.writerow(OperationProfile._fields)
+    for operation_profile in aggregate_profiles(node_id_to_node.values()):
+        file_writer.writerow(operation_profile)
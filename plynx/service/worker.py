@@ -5,13 +5,14 @@ import socket
 import sys
 import threading
 import uuid
-from typing import Dict, Optional, Set
+from typing import Dict, List, Optional, Set
 
-from plynx.base.executor import BaseExecutor
+from plynx.constants import NodeRunningStatus
 from plynx.db.worker_state import WorkerState
 from plynx.utils.common import ObjectId
 from plynx.utils.config import WorkerConfig, get_worker_config
-from plynx.utils.executor import DBJobExecutor, materialize_executor, post_request
+from plynx.utils.executor import REQUESTS_TIMEOUT, DBJobExecutor, materialize_executor, post_request
+from plynx.utils.resource_cache import get_resource_cache
 
 
 class Worker:
@@ -39,15 +40,25 @@ class Worker:
     # Worker State update timeout
     WORKER_STATE_UPDATE_TIMEOUT: int = 1
 
+    # Longest round of the Worker State update, the leases are renewed once per round
+    MAX_WORKER_STATE_UPDATE_DURATION: int = 3 * REQUESTS_TIMEOUT + WORKER_STATE_UPDATE_TIMEOUT
+
     def __init__(self, worker_config: WorkerConfig, worker_id: Optional[str]):
         self.worker_id = worker_id if worker_id else str(uuid.uuid1())
         self.kinds = worker_config.kinds
+        self.lease_duration = worker_config.lease_duration
+        if self.lease_duration < 2 * Worker.MAX_WORKER_STATE_UPDATE_DURATION:
+            logging.warning(
+                f"Lease duration {self.lease_duration} sec is too short: a round of the lease renewal can take up to "
+                f"{Worker.MAX_WORKER_STATE_UPDATE_DURATION} sec, so the runs might be picked by another worker"
+            )
+        self.profiling_mode = worker_config.profiling
         self.host = socket.gethostname()
         self._stop_event = threading.Event()
 
         # Mapping keep track of Worker Status
-        self._run_id_to_executor: Dict[ObjectId, BaseExecutor] = {}
-        self._run_id_to_executor_lock = threading.Lock()
+        self._run_id_to_job: Dict[ObjectId, DBJobExecutor] = {}
+        self._run_id_to_job_lock = threading.Lock()
 
         # Start new threads
         self._thread_db_status_update = threading.Thread(target=self._run_db_status_update, args=())
@@ -64,20 +75,26 @@ class Worker:
         """
         self._stop_event.wait()
 
-    def execute_job(self, executor: BaseExecutor):
+    def execute_job(self, job: DBJobExecutor):
         """Run a single job in the executor"""
-        assert executor.node, "Executor has no `node` attribute defined"
-        db_executor = DBJobExecutor(executor)
-        db_executor.run()
+        assert job.executor.node, "Executor has no `node` attribute defined"
+        job.run()
 
-        with self._run_id_to_executor_lock:
-            del self._run_id_to_executor[executor.node._id]
+        with self._run_id_to_job_lock:
+            del self._run_id_to_job[job.executor.node._id]
 
     def _run_db_status_update(self):
         """Syncing with the database."""
         try:
             while not self._stop_event.is_set():
-                response = post_request("pick_run", data={"kinds": self.kinds})
+                response = post_request(
+                    "pick_run",
+                    data={
+                        "kinds": self.kinds,
+                        "worker_id": self.worker_id,
+                        "lease_duration": self.lease_duration,
+                    },
+                )
                 if response:
                     node = response["node"]
                 else:
@@ -87,10 +104,11 @@ class Worker:
                 if node:
                     logging.info(f"New node found: {node['_id']} {node['node_running_status']} {node['title']}")
                     executor = materialize_executor(node)
+                    job = DBJobExecutor(executor, self.profiling_mode)
 
-                    with self._run_id_to_executor_lock:
-                        self._run_id_to_executor[executor.node._id] = executor
-                    thread = threading.Thread(target=self.execute_job, args=(executor, ))
+                    with self._run_id_to_job_lock:
+                        self._run_id_to_job[executor.node._id] = job
+                    thread = threading.Thread(target=self.execute_job, args=(job, ))
                     thread.start()
 
                 else:
@@ -106,22 +124,25 @@ class Worker:
         try:
             while not self._stop_event.is_set():
                 # TODO move CANCEL to a separate thread
-                run_ids = list(self._run_id_to_executor.keys())
+                run_ids = list(self._run_id_to_job.keys())
                 if run_ids:
                     response = post_request("get_run_cancelations", data={"run_ids": run_ids}, num_retries=1)
                     runs_to_kill = [] if not response else response["run_ids_to_cancel"]
                     for run_id in runs_to_kill:
-                        self._run_id_to_executor[run_id].kill()
+                        self._run_id_to_job[run_id].executor.kill()
+                    self._renew_leases(run_ids)
 
                 runs = []
-                with self._run_id_to_executor_lock:
-                    for executor in self._run_id_to_executor.values():
-                        runs.append(executor.node.to_dict())
+                with self._run_id_to_job_lock:
+                    for job in self._run_id_to_job.values():
+                        runs.append(job.executor.node.to_dict())
+                resource_cache = get_resource_cache()
                 worker_state = WorkerState(
                     worker_id=self.worker_id,
                     host=self.host,
                     runs=runs,
                     kinds=self.kinds,
+                    resource_cache=resource_cache.get_stats() if resource_cache else None,
                 )
                 post_request("push_worker_state", data={"worker_state": worker_state.to_dict()}, num_retries=1)
                 self._stop_event.wait(timeout=Worker.WORKER_STATE_UPDATE_TIMEOUT)
@@ -131,6 +152,32 @@ class Worker:
         finally:
             logging.info(f"Exit {self._run_worker_state_update.__name__}")
 
+    def _renew_leases(self, run_ids: List[ObjectId]):
+        """Renew the leases of the runs. The runs with lost leases might be picked by another worker, so they are abandoned."""
+        response = post_request(
+            "renew_run_leases",
+            data={
+                "run_ids": run_ids,
+                "worker_id": self.worker_id,
+                "lease_duration": self.lease_duration,
+            },
+            num_retries=1,
+        )
+        if not response:
+            logging.error("Failed to renew the leases.")
+            return
+        renewed_run_ids = set(map(str, response["run_ids"]))
+        for run_id in run_ids:
+            if str(run_id) in renewed_run_ids:
+                continue
+            with self._run_id_to_job_lock:
+                job = self._run_id_to_job.get(run_id)
+            # The run is not RUNNING in the database once the job has saved its final status
+            if not job or not job.executor.node or NodeRunningStatus.is_finished(job.executor.node.node_running_status):
+                continue
+            logging.warning(f"Lease of the run `{run_id}` has been lost, abandon the run")
+            job.abandon()
+
     def stop(self):
         """Stop worker."""
         self._stop_event.set()
@@ -141,6 +188,10 @@ def run_worker(worker_id: Optional[str] = None):
     logging.info("Init Worker")
     worker_config = get_worker_config()
     logging.info(worker_config)
+    if worker_config.warm_up:
+        # lazy load because python operations are optional
+        from plynx.plugins.executors.python.local import warm_up_stateful_operations  # pylint: disable=import-outside-toplevel
+        warm_up_stateful_operations(worker_config.warm_up)
     worker = Worker(worker_config, worker_id)
 
     # Activate the server; this will keep running until you
@@ -9,6 +9,7 @@ from flask.logging import create_logger
 from flask_cors import CORS
 
 from plynx.db.node import Node
+from plynx.utils.config import get_worker_config
 from plynx.utils.executor import DBJobExecutor, materialize_executor, post_request
 from plynx.utils.logs import set_logging_level
 from plynx.web.common import make_fail_response, make_success_response
@@ -64,7 +65,7 @@ def execute_run():
     node = Node.from_dict(node_dict)
 
     executor = materialize_executor(node)
-    db_executor = DBJobExecutor(executor)
+    db_executor = DBJobExecutor(executor, get_worker_config().profiling)
     db_executor.run()
 
     app.logger.info("Finished running the job.")   # pylint: disable=no-member
@@ -0,0 +1,161 @@
+"""Packing of the directories into archives and streaming extraction"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import zipfile
+from typing import BinaryIO, List
+
+from plynx.utils.common import zipdir
+
+ZIP_MAGIC = b"PK\x03\x04"
+# Empty zip file starts with the end of central directory record
+EMPTY_ZIP_MAGIC = b"PK\x05\x06"
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class DirectoryCodec:
+    """How the Directory resources are packed"""
+    # Single-threaded deflate, compatible with the previous versions
+    ZIP: str = "zip"
+    # No compression, fast for the directories of already compressed files
+    ZIP_STORED: str = "zip-stored"
+    # Uncompressed tar, written and extracted as a stream
+    TAR: str = "tar"
+    # Gzipped tar. Compressed with multithreaded `pigz` if it is installed.
+    TAR_GZ: str = "tar-gz"
+
+
+CODECS = [
+    DirectoryCodec.ZIP,
+    DirectoryCodec.ZIP_STORED,
+    DirectoryCodec.TAR,
+    DirectoryCodec.TAR_GZ,
+]
+
+
+def _add_directory_to_tar(path: str, tar_file: tarfile.TarFile):
+    for name in sorted(os.listdir(path)):
+        tar_file.add(os.path.join(path, name), arcname=name)
+
+
+def pack_directory(path: str, codec: str) -> str:
+    """Pack the directory into an archive next to it.
+
+    Return:
+        (str)   Filename of the archive
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown directory codec `{codec}`, expected one of {CODECS}")
+    archive_filename = f"{path}.archive"
+    if codec in {DirectoryCodec.ZIP, DirectoryCodec.ZIP_STORED}:
+        compression = zipfile.ZIP_DEFLATED if codec == DirectoryCodec.ZIP else zipfile.ZIP_STORED
+        with zipfile.ZipFile(archive_filename, "w", compression) as zip_file:
+            zipdir(path, zip_file)
+    elif codec == DirectoryCodec.TAR:
+        with tarfile.open(archive_filename, "w|") as tar_file:
+            _add_directory_to_tar(path, tar_file)
+    elif shutil.which("pigz"):
+        with open(archive_filename, "wb") as archive_file:
+            with subprocess.Popen(["pigz", "-c"], stdin=subprocess.PIPE, stdout=archive_file) as pigz:
+                assert pigz.stdin, "stdin of pigz is not open"
+                with pigz.stdin, tarfile.open(fileobj=pigz.stdin, mode="w|") as tar_file:
+                    _add_directory_to_tar(path, tar_file)
+        if pigz.returncode:
+            raise IOError(f"pigz returned non-zero value {pigz.returncode}")
+    else:
+        logging.warning("`pigz` is not installed, falling back to single-threaded gzip")
+        with tarfile.open(archive_filename, "w|gz") as tar_file:
+            _add_directory_to_tar(path, tar_file)
+    return archive_filename
+
+
+def _is_zip(stream: io.BufferedReader) -> bool:
+    """Check the magic bytes of the archive without consuming the stream"""
+    magic = stream.peek(len(ZIP_MAGIC))[:len(ZIP_MAGIC)]
+    return magic in {ZIP_MAGIC, EMPTY_ZIP_MAGIC}
+
+
+def _make_peekable(stream: BinaryIO) -> io.BufferedReader:
+    if isinstance(stream, io.BufferedReader):
+        return stream
+    return io.BufferedReader(stream)  # type: ignore
+
+
+def _is_within(filename: str, path: str) -> bool:
+    return os.path.commonpath([os.path.realpath(filename), os.path.realpath(path)]) == os.path.realpath(path)
+
+
+def _check_tar_member(tar_info: tarfile.TarInfo, path: str):
+    """Check the member the same way as `tarfile.data_filter` on the versions of python that do not have it"""
+    if os.path.isabs(tar_info.name):
+        raise tarfile.ExtractError(f"Member `{tar_info.name}` has an absolute path")
+    filename = os.path.join(path, tar_info.name)
+    if not _is_within(filename, path):
+        raise tarfile.ExtractError(f"Member `{tar_info.name}` is outside of the destination")
+    if not (tar_info.isfile() or tar_info.isdir() or tar_info.issym() or tar_info.islnk()):
+        raise tarfile.ExtractError(f"Member `{tar_info.name}` is a special file")
+    if tar_info.issym():
+        link_target = os.path.join(os.path.dirname(filename), tar_info.linkname)
+    elif tar_info.islnk():
+        link_target = os.path.join(path, tar_info.linkname)
+    else:
+        return
+    if os.path.isabs(tar_info.linkname) or not _is_within(link_target, path):
+        raise tarfile.ExtractError(f"Member `{tar_info.name}` links outside of the destination")
+
+
+def _extract_tar_stream(stream: BinaryIO, path: str):
+    with tarfile.open(fileobj=stream, mode="r|*") as tar_file:
+        if hasattr(tarfile, "data_filter"):
+            # Reject absolute paths, links outside of the directory, device files etc.
+            tar_file.extractall(path, filter="data")    # pylint: disable=unexpected-keyword-arg
+            return
+        for tar_info in tar_file:
+            _check_tar_member(tar_info, path)
+            # Do not restore setuid and setgid bits
+            tar_info.mode &= 0o777
+            tar_file.extract(tar_info, path)
+
+
+def extract_stream(stream: BinaryIO, path: str) -> bool:
+    """Extract a tar archive from a stream, i.e. directly from the storage.
+
+    Zip archives need random access to the central directory at the end of the file, so they are written to `path`
+    as is and have to be extracted with `extract_file` later. The stream is consumed in both cases.
+
+    Return:
+        (bool)  True if `path` is the extracted directory, False if `path` is the zip archive file
+    """
+    stream = _make_peekable(stream)
+    if _is_zip(stream):
+        with open(path, "wb") as archive_file:
+            shutil.copyfileobj(stream, archive_file, COPY_BUFFER_SIZE)
+        return False
+    os.mkdir(path)
+    _extract_tar_stream(stream, path)
+    return True
+
+
+def extract_file(archive_filename: str, path: str):
+    """Extract a zip or tar archive"""
+    os.mkdir(path)
+    with open(archive_filename, "rb") as stream:
+        if _is_zip(stream):
+            with zipfile.ZipFile(stream) as zip_file:
+                zip_file.extractall(path)
+        else:
+            _extract_tar_stream(stream, path)
+
+
+def list_archive(stream: BinaryIO) -> List[str]:
+    """List the names of the files in the archive"""
+    if zipfile.is_zipfile(stream):
+        stream.seek(0)
+        with zipfile.ZipFile(stream, "r") as zip_file:
+            return zip_file.namelist()
+    stream.seek(0)
+    with tarfile.open(fileobj=stream, mode="r|*") as tar_file:
+        return [tar_info.name for tar_info in tar_file]
@@ -13,9 +13,9 @@ DEFAULT_ICON: str = "feathericons.x-square"
 DEFAULT_COLOR: str = "#ffffff"
 _CONFIG = None
 
-WorkerConfig = namedtuple("WorkerConfig", ["kinds", "api"])
+WorkerConfig = namedtuple("WorkerConfig", ["kinds", "api", "lease_duration", "warm_up", "profiling", "resource_cache_dir", "resource_cache_size"])
 MongoConfig = namedtuple("MongoConfig", ["user", "password", "host", "port"])
-StorageConfig = namedtuple("StorageConfig", ["scheme", "prefix", "credential_path"])
+StorageConfig = namedtuple("StorageConfig", ["scheme", "prefix", "credential_path", "directory_codec"])
 AuthConfig = namedtuple("AuthConfig", ["secret_key"])
 WebConfig = namedtuple("WebConfig", ["host", "port", "endpoint", "internal_endpoint", "debug"])
 DemoConfig = namedtuple("DemoConfig", ["enabled", "kind", "template_ids"])
@@ -63,6 +63,16 @@ def get_worker_config() -> WorkerConfig:
     return WorkerConfig(
         kinds=(_get_config().get("worker", {}).get("kinds", [])),
         api=(_get_config().get("worker", {}).get("api", "http://api:5005")),
+        # Seconds. Must be several times longer than a round of the worker state update, which makes up to 3 requests.
+        lease_duration=float(_get_config().get("worker", {}).get("lease_duration", 120)),
+        warm_up=(_get_config().get("worker", {}).get("warm_up", [])),
+        profiling=(_get_config().get("worker", {}).get("profiling", "off")),
+        resource_cache_dir=(_get_config().get("worker", {}).get(
+            "resource_cache_dir",
+            os.path.join(os.path.expanduser("~"), "plynx", "resource_cache")
+        )),
+        # Bytes, 0 disables the cache
+        resource_cache_size=int(_get_config().get("worker", {}).get("resource_cache_size", 0)),
     )
 
 
@@ -85,6 +95,7 @@ def get_storage_config() -> StorageConfig:
             os.path.join(os.path.expanduser("~"), "plynx", "data")
         ),
         credential_path=_get_config().get("storage", {}).get("credential_path", None),
+        directory_codec=_get_config().get("storage", {}).get("directory_codec", "zip"),
     )
 
 
@@ -27,6 +27,8 @@ def init_indexes():
 
     _DB[Collections.RUNS].create_index("insertion_date")
     _DB[Collections.RUNS].create_index([("title", pymongo.TEXT), ("description", pymongo.TEXT)])
+    _DB[Collections.RUNS].create_index("original_node_id")
+    _DB[Collections.RUNS].create_index([("node_running_status", pymongo.ASCENDING), ("lease_expiration_date", pymongo.ASCENDING)])
 
     _DB[Collections.USERS].create_index("username", unique=True)
 
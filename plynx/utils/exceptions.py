@@ -5,6 +5,10 @@ class ExecutorNotFound(ImportError):
     """Executor not imported"""
 
 
+class NodeTimeoutError(Exception):
+    """Node has exceeded its `_timeout`"""
+
+
 class RegisterUserException(Exception):
     """Failed to register the user"""
     def __init__(self, message: str, error_code: str):
@@ -4,12 +4,13 @@ import logging
 import threading
 import time
 import traceback
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 
 import requests
 import six
 
 import plynx.db.node
+import plynx.db.run_status_watcher
 import plynx.utils.exceptions
 import plynx.utils.plugin_manager
 from plynx.base.executor import BaseExecutor
@@ -17,6 +18,7 @@ from plynx.constants import NodeRunningStatus
 from plynx.utils.common import JSONEncoder
 from plynx.utils.config import get_web_config
 from plynx.utils.file_handler import upload_file_stream
+from plynx.utils.profiler import ProfilingMode, profile_node
 
 CONNECT_POST_TIMEOUT = 1.0
 REQUESTS_TIMEOUT = 10
@@ -69,16 +71,31 @@ def materialize_executor(node: Union[Dict[str, Any], plynx.db.node.Node]) -> Bas
     return cls(node)
 
 
+def get_node_timeout(node: plynx.db.node.Node) -> Optional[float]:
+    """Get the value of `_timeout` parameter in seconds. Return None if the timeout is not set."""
+    parameter = node.get_parameter_by_name_safe("_timeout")
+    if not parameter or not parameter.value:
+        return None
+    timeout = float(parameter.value)
+    return timeout if timeout > 0 else None
+
+
 class TickThread:
     """
     This class is a Context Manager wrapper.
-    It calls method `tick()` of the executor with a given interval
+    It calls method `tick()` of the executor with a given interval.
+
+    It also serves as a watchdog: the executor is killed when it runs longer than `_timeout` parameter.
     """
 
-    TICK_TIMEOUT: int = 1
+    TICK_TIMEOUT: float = 1
 
     def __init__(self, executor: BaseExecutor):
+        assert executor.node, "Executor has no `node` attribute defined"
         self.executor = executor
+        self.timeout = get_node_timeout(executor.node)
+        self.timed_out = False
+        self._start_time = time.time()
         self._stop_event = threading.Event()
         self._tick_thread = threading.Thread(target=self.call_executor_tick, args=())
 
@@ -86,30 +103,52 @@ class TickThread:
         """
         Currently no meaning of returned class
         """
+        self._start_time = time.time()
         self._tick_thread.start()
         return self
 
     def __exit__(self, type_cls, value, traceback_val):
+        self.stop()
+
+    def stop(self):
+        """Stop calling the ticks and saving the node"""
         self._stop_event.set()
 
     def call_executor_tick(self):
         """Run timed ticks"""
         while not self._stop_event.is_set():
             self._stop_event.wait(timeout=TickThread.TICK_TIMEOUT)
+            if not self._stop_event.is_set():
+                self.check_timeout()
             if self.executor.is_updated() and not self._stop_event.is_set():
                 # Save logs when operation is running
                 if NodeRunningStatus.is_finished(self.executor.node.node_running_status):
                     break
                 _update_node(self.executor.node)
 
+    def check_timeout(self):
+        """Kill the executor if the deadline has passed"""
+        if self.timed_out or self.timeout is None or time.time() - self._start_time < self.timeout:
+            return
+        assert self.executor.node, "Executor has no `node` attribute defined"
+        logging.warning(f"Node {self.executor.node._id} `{self.executor.node.title}` exceeded the timeout of {self.timeout} sec")
+        self.timed_out = True
+        try:
+            self.executor.kill()
+        except Exception:   # pylint: disable=broad-except
+            logging.error(f"Failed to kill the executor: {traceback.format_exc()}")
+
 
 class DBJobExecutor:
     """Executes a single job in an executor and updates its status."""
 
-    def __init__(self, executor: BaseExecutor):
+    def __init__(self, executor: BaseExecutor, profiling_mode: str = ProfilingMode.OFF):
         assert executor.node, "Executor has no `node` attribute defined"
         self.executor = executor
+        self.profiling_mode = profiling_mode
         self._killed = False
+        self._abandoned = False
+        self._tick_thread: Optional[TickThread] = None
 
     def run(self) -> str:
         """Run the job in the executor"""
@@ -119,8 +158,17 @@ class DBJobExecutor:
             try:
                 status = NodeRunningStatus.FAILED
                 self.executor.init_executor()
-                with TickThread(self.executor):
+                self._tick_thread = TickThread(self.executor)
+                # The executors that run a subprocess report its resource usage
+                get_subprocess_rusage = getattr(self.executor, "get_subprocess_rusage", None)
+                with self._tick_thread as tick_thread, \
+                        profile_node(self.executor.node, self.profiling_mode, get_subprocess_rusage=get_subprocess_rusage):
                     status = self.executor.run()
+                if tick_thread.timed_out:
+                    status = NodeRunningStatus.FAILED
+                    raise plynx.utils.exceptions.NodeTimeoutError(
+                        f"The node has been running longer than `_timeout` ({tick_thread.timeout} sec) and was killed"
+                    )
             except Exception:   # pylint: disable=broad-except
                 try:
                     f = six.BytesIO()
@@ -141,7 +189,12 @@ class DBJobExecutor:
             logging.warning(f"Execution failed: {e}")
             self.executor.node.node_running_status = NodeRunningStatus.FAILED
         finally:
-            _update_node(self.executor.node)
+            if self._abandoned:
+                logging.warning(f"Node {self.executor.node._id} has been abandoned, its status is not saved")
+            else:
+                _update_node(self.executor.node)
+            # Wake up a DAG scheduler waiting for this node in the same process
+            plynx.db.run_status_watcher.run_status_watcher().notify(self.executor.node._id)
 
             self._killed = True
 
@@ -155,3 +208,12 @@ class DBJobExecutor:
         if NodeRunningStatus.is_finished(self.executor.node.node_running_status):
             self.executor.kill()
         self._killed = True
+
+    def abandon(self) -> None:
+        """Kill the job without saving it: the run has been leased to another worker"""
+        if self._abandoned:
+            return
+        self._abandoned = True
+        if self._tick_thread:
+            self._tick_thread.stop()
+        self.executor.abandon()
@@ -1,7 +1,12 @@
 """Smart file handeling"""
 
+import hashlib
+import io
+import json
+import os
+import shutil
 import uuid
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Optional, Tuple
 
 import smart_open
 
@@ -9,6 +14,13 @@ from plynx.utils.config import StorageConfig, get_storage_config
 
 _GLOBAL_STORAGE_CONFIG: Optional[StorageConfig] = None
 
+# Resources with this suffix are stored as a manifest and a list of segments `<resource_id>_<index>`
+SEGMENTED_RESOURCE_SUFFIX = ".segmented"
+# Segments are sealed when they reach this size, only the last open segment is uploaded again on update
+SEGMENT_SIZE = 4 * 1024 * 1024
+# Streams are uploaded in chunks of this size instead of being read into memory
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+
 
 def _get_global_storage_config() -> StorageConfig:
     global _GLOBAL_STORAGE_CONFIG   # pylint: disable=global-statement
@@ -26,6 +38,8 @@ def open(filename: str, mode: str = "rt"):  # pylint: disable=redefined-builtin
 def get_file_stream(file_path: str, preview: bool = False, file_type=None) -> BinaryIO:  # pylint: disable=unused-argument
     """Get file stream object (deprecated)"""
     # TODO: remove this function
+    if file_path.endswith(SEGMENTED_RESOURCE_SUFFIX):
+        return io.BufferedReader(_SegmentedReader(file_path))  # type: ignore
     return open(file_path, "rb")
 
 
@@ -37,5 +51,109 @@ def upload_file_stream(fp: BinaryIO, file_path: Optional[str] = None, seek: bool
     if file_path is None:
         file_path = str(uuid.uuid1())
     with open(file_path, "wb") as fo:   # pylint: disable=invalid-name
-        fo.write(fp.read())
+        shutil.copyfileobj(fp, fo, UPLOAD_BUFFER_SIZE)
     return file_path
+
+
+def upload_file_with_checksum(filename: str, file_path: Optional[str] = None) -> Tuple[str, str]:
+    """Upload a local file in chunks and compute its sha256 on the way.
+
+    Return:
+        (str)   Resource id
+        (str)   Hex digest of sha256 of the content
+    """
+    if file_path is None:
+        file_path = str(uuid.uuid1())
+    checksum = hashlib.sha256()
+    with io.open(filename, "rb") as src, open(file_path, "wb") as dst:
+        while True:
+            chunk = src.read(UPLOAD_BUFFER_SIZE)
+            if not chunk:
+                break
+            checksum.update(chunk)
+            dst.write(chunk)
+    return file_path, checksum.hexdigest()
+
+
+class _SegmentedReader(io.RawIOBase):
+    """Read the segments of a segmented resource one after another"""
+
+    def __init__(self, resource_id: str):
+        super().__init__()
+        with open(resource_id, "r") as f:
+            self._num_segments = json.load(f)["num_segments"]
+        self._resource_id = resource_id
+        self._segment_index = 0
+        self._segment: Optional[BinaryIO] = None
+
+    def readable(self) -> bool:
+        """The stream is readable"""
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        """Read the bytes of the current segment into the buffer"""
+        while self._segment_index < self._num_segments:
+            if self._segment is None:
+                self._segment = open(f"{self._resource_id}_{self._segment_index}", "rb")
+            num_bytes = self._segment.readinto(buffer)  # type: ignore
+            if num_bytes:
+                return num_bytes
+            self._segment.close()
+            self._segment = None
+            self._segment_index += 1
+        return 0
+
+    def close(self):
+        """Close the current segment"""
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        super().close()
+
+
+class SegmentedUpload:
+    """Upload a growing local file, i.e. a log, sending only the bytes appended since the previous upload.
+
+    The file is stored as a segmented resource: full segments of SEGMENT_SIZE bytes are uploaded once,
+    the last partial segment is uploaded again as it grows. The manifest is updated when a segment is added.
+    """
+
+    def __init__(self, resource_id: Optional[str] = None):
+        self.resource_id = resource_id or f"{uuid.uuid1()}{SEGMENTED_RESOURCE_SUFFIX}"
+        self.uploaded_size = 0
+        self._sealed_size = 0
+        self._num_sealed_segments = 0
+        self._num_segments_in_manifest = 0
+
+    def upload(self, filename: str) -> bool:
+        """Upload the new bytes of the file.
+
+        Return:
+            (bool)  True if the resource was updated
+        """
+        size = os.stat(filename).st_size
+        if size == self.uploaded_size:
+            return False
+        with io.open(filename, "rb") as f:
+            f.seek(self._sealed_size)
+            num_segments = self._num_sealed_segments
+            while self._sealed_size < size:
+                data = f.read(min(SEGMENT_SIZE, size - self._sealed_size))
+                if not data:
+                    # The file was truncated, keep what has been uploaded
+                    size = self._sealed_size
+                    break
+                with open(f"{self.resource_id}_{self._num_sealed_segments}", "wb") as segment:
+                    segment.write(data)
+                num_segments = self._num_sealed_segments + 1
+                if len(data) < SEGMENT_SIZE:
+                    break
+                self._sealed_size += len(data)
+                self._num_sealed_segments += 1
+        if num_segments != self._num_segments_in_manifest or self.uploaded_size == 0:
+            # The segments are written before the manifest, so the readers never see a missing segment
+            with open(self.resource_id, "w") as manifest:
+                json.dump({"num_segments": num_segments}, manifest)
+            self._num_segments_in_manifest = num_segments
+        self.uploaded_size = size
+        return True
@@ -409,7 +409,9 @@ def reset_nodes(node: Node):
         sub_node.node_running_status = NodeRunningStatus.READY
         for resource in sub_node.outputs + sub_node.logs:
             resource.values = []
+            resource.checksum = None
         sub_node._cached_node = None
+        sub_node.profile = None
 
 
 def traverse_left_join(node: Node, other_node: Node):
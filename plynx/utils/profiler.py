@@ -0,0 +1,165 @@
+"""Time and memory profiling of the Operations"""
+import contextlib
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, namedtuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from plynx.db.node import Node, NodeProfile
+from plynx.utils.common import ObjectId
+
+
+class ProfilingMode:
+    """What is measured when an Operation runs.
+
+    The Operations that run in a subprocess, i.e. bash, report the CPU time and the max RSS of the subprocess
+    and its descendants in both modes.
+    """
+    OFF: str = "off"
+    # Wall time, CPU time of the thread and the high-water mark of the RSS of the process since it started
+    RSS: str = "rss"
+    # Wall time, CPU time of the thread and peak of the python allocations of the process traced by `tracemalloc`
+    # while the Operation was running. Adds overhead to every allocation while any Operation is traced.
+    TRACEMALLOC: str = "tracemalloc"
+
+
+OperationProfile = namedtuple(
+    "OperationProfile",
+    [
+        "original_node_id", "title", "num_runs",
+        "total_wall_time", "mean_wall_time", "max_wall_time",
+        "total_cpu_time", "mean_cpu_time",
+        "max_process_peak_memory",
+    ]
+)
+
+_tracemalloc_lock = threading.Lock()
+_NUM_TRACEMALLOC_USERS = 0
+_TRACEMALLOC_STARTED = False
+
+
+def _max_rss_to_bytes(max_rss: int) -> int:
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _get_max_rss() -> int:
+    """High-water mark of the resident set size of the process in bytes, since the process started"""
+    return _max_rss_to_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+@contextlib.contextmanager
+def _trace_python_allocations() -> Iterator[None]:
+    """Keep `tracemalloc` running while at least one Operation is profiled.
+
+    The peak is shared by the process, so it is reset only when no other Operation is traced.
+    """
+    global _NUM_TRACEMALLOC_USERS, _TRACEMALLOC_STARTED   # pylint: disable=global-statement
+    with _tracemalloc_lock:
+        if _NUM_TRACEMALLOC_USERS == 0:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                _TRACEMALLOC_STARTED = True
+        _NUM_TRACEMALLOC_USERS += 1
+    try:
+        yield
+    finally:
+        with _tracemalloc_lock:
+            _NUM_TRACEMALLOC_USERS -= 1
+            if _NUM_TRACEMALLOC_USERS == 0 and _TRACEMALLOC_STARTED:
+                tracemalloc.stop()
+                _TRACEMALLOC_STARTED = False
+
+
+@contextlib.contextmanager
+def profile_node(
+        node: Node,
+        mode: str,
+        measure_cpu_time: bool = True,
+        get_subprocess_rusage: Optional[Callable[[], Optional[resource.struct_rusage]]] = None,
+        ) -> Iterator[None]:
+    """Measure the Operation executed inside the context and store the results in `node.profile`.
+
+    The CPU time is measured for the current thread, so it does not include the subprocesses or
+    the other threads, i.e. asyncio tasks that share the thread. Pass `measure_cpu_time=False` in that case.
+    The memory peaks belong to the process, not to the Operation: see ProfilingMode.
+    When Operations run concurrently, the peak is an upper bound for each of them.
+
+    The Operations that run in a subprocess pass `get_subprocess_rusage` instead. It is called when the Operation
+    is over, the CPU time and the memory are not reported if it returns None, i.e. the subprocess has not started.
+
+    Args:
+        node                    (Node):     Node to profile
+        mode                    (str):      ProfilingMode
+        measure_cpu_time        (bool):     Measure CPU time of the thread
+        get_subprocess_rusage   (Callable): Get the resource usage of the finished subprocess
+    """
+    if mode == ProfilingMode.OFF:
+        yield
+        return
+
+    with contextlib.ExitStack() as stack:
+        if mode == ProfilingMode.TRACEMALLOC and get_subprocess_rusage is None:
+            stack.enter_context(_trace_python_allocations())
+        start_time = time.perf_counter()
+        start_cpu_time = time.thread_time()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start_time
+            if get_subprocess_rusage is not None:
+                rusage = get_subprocess_rusage()
+                cpu_time = rusage.ru_utime + rusage.ru_stime if rusage else None
+                peak_memory = _max_rss_to_bytes(rusage.ru_maxrss) if rusage else None
+            else:
+                cpu_time = time.thread_time() - start_cpu_time if measure_cpu_time else None
+                peak_memory = tracemalloc.get_traced_memory()[1] if mode == ProfilingMode.TRACEMALLOC else _get_max_rss()
+            node.profile = NodeProfile(
+                mode=mode,
+                wall_time=wall_time,
+                cpu_time=cpu_time,
+                peak_memory=peak_memory,
+            )
+
+
+def aggregate_profiles(nodes: Iterable[Node]) -> List[OperationProfile]:
+    """Build a per-Operation report from the profiled Nodes.
+
+    Runs of the same Operation are grouped by `original_node_id`, or by title if it is undefined.
+
+    Return:
+        (list of OperationProfile)  Sorted by the total wall time, descending
+    """
+    key_to_title: Dict[Union[ObjectId, str], str] = {}
+    key_to_profiles: Dict[Union[ObjectId, str], List[NodeProfile]] = defaultdict(list)
+    for node in nodes:
+        if node.profile is None:
+            continue
+        key = node.original_node_id or node.title
+        key_to_title[key] = node.title
+        key_to_profiles[key].append(node.profile)
+
+    res = []
+    for key, profiles in key_to_profiles.items():
+        wall_times = [profile.wall_time for profile in profiles]
+        cpu_times = [profile.cpu_time for profile in profiles if profile.cpu_time is not None]
+        peak_memories = [profile.peak_memory for profile in profiles if profile.peak_memory is not None]
+        res.append(
+            OperationProfile(
+                original_node_id=key if isinstance(key, ObjectId) else None,
+                title=key_to_title[key],
+                num_runs=len(profiles),
+                total_wall_time=sum(wall_times),
+                mean_wall_time=sum(wall_times) / len(wall_times),
+                max_wall_time=max(wall_times),
+                total_cpu_time=sum(cpu_times) if cpu_times else None,
+                mean_cpu_time=sum(cpu_times) / len(cpu_times) if cpu_times else None,
+                max_process_peak_memory=max(peak_memories) if peak_memories else None,
+            )
+        )
+    return sorted(res, key=lambda operation_profile: -operation_profile.total_wall_time)
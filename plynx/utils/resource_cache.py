@@ -0,0 +1,162 @@
+"""Worker-local disk cache of the resources"""
+import errno
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Optional
+
+from plynx.db.worker_state import ResourceCacheStats
+from plynx.utils.config import get_worker_config
+
+
+class ResourceCache:
+    """LRU of the downloaded resources keyed by resource id, bounded by the total size on disk.
+
+    The resources are immutable, so the cached files are made read-only and hardlinked into the workdirs.
+    A job cannot modify its inputs in place without corrupting the cache otherwise. Read-only mode does not stop
+    root, so the files are copied instead when the worker runs as root.
+    Evicted files are unlinked from the cache directory only, the workdirs keep their links.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, directory: str, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._filename_to_lock: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        # Cached filename -> size
+        self._filename_to_size: Dict[str, int] = OrderedDict()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Pick up the files cached before the restart, the least recently used first"""
+        filenames = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            filenames.append((entry.stat().st_mtime, entry.path, entry.stat().st_size))
+        for _, filename, size in sorted(filenames):
+            self._filename_to_size[filename] = size
+            self.size += size
+        self._evict()
+
+    def _get_cached_filename(self, resource_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(resource_id.encode()).hexdigest())
+
+    def _evict(self):
+        """Remove the least recently used files. Must be called under the lock."""
+        while self.size > self.max_size and self._filename_to_size:
+            filename, size = self._filename_to_size.popitem(last=False)     # type: ignore
+            self.size -= size
+            self._filename_to_lock.pop(filename, None)
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
+
+    def _touch(self, cached_filename: str) -> bool:
+        """Mark the file as recently used if it is cached"""
+        with self._lock:
+            if cached_filename not in self._filename_to_size:
+                return False
+            self._filename_to_size.move_to_end(cached_filename)     # type: ignore
+        return True
+
+    def stage(self, resource_id: str, filename: str, download: Callable[[str, str], int]) -> int:
+        """Put the resource to `filename`, downloading it with `download(resource_id, filename)` on cache miss.
+
+        Return:
+            (int)   Number of bytes
+        """
+        cached_filename = self._get_cached_filename(resource_id)
+        with self._lock:
+            resource_lock = self._filename_to_lock[cached_filename]
+        with resource_lock:
+            if self._touch(cached_filename):
+                try:
+                    # Keep the order after the restart
+                    os.utime(cached_filename)
+                    size = _link_or_copy(cached_filename, filename)
+                    with self._lock:
+                        self.hits += 1
+                    return size
+                except FileNotFoundError:
+                    # Evicted in the meantime
+                    pass
+            try:
+                return self._download(resource_id, cached_filename, filename, download)
+            except Exception:
+                # Do not keep the locks of the resources that have not been cached
+                with self._lock:
+                    if self._filename_to_lock.get(cached_filename) is resource_lock:
+                        del self._filename_to_lock[cached_filename]
+                raise
+
+    def _download(self, resource_id: str, cached_filename: str, filename: str, download: Callable[[str, str], int]) -> int:
+        tmp_fd, tmp_filename = tempfile.mkstemp(dir=self.directory, prefix=".")
+        os.close(tmp_fd)
+        try:
+            size = download(resource_id, tmp_filename)
+            os.chmod(tmp_filename, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            # Link to the workdir first, so that the file is not evicted before it is staged
+            _link_or_copy(tmp_filename, filename)
+            os.replace(tmp_filename, cached_filename)
+        except Exception:
+            os.unlink(tmp_filename)
+            raise
+        with self._lock:
+            self.misses += 1
+            # The file could have been cached and removed from the directory outside of the cache
+            self.size -= self._filename_to_size.pop(cached_filename, 0)
+            self._filename_to_size[cached_filename] = size
+            self.size += size
+            self._evict()
+        return size
+
+    def get_stats(self) -> ResourceCacheStats:
+        """Get the hit rate and the size of the cache"""
+        with self._lock:
+            num_requests = self.hits + self.misses
+            return ResourceCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                hit_rate=self.hits / num_requests if num_requests else 0.,
+                size=self.size,
+                max_size=self.max_size,
+                num_resources=len(self._filename_to_size),
+            )
+
+
+def _link_or_copy(src: str, dst: str) -> int:
+    """Hardlink the file, copy it if the workdir is on another device or the worker runs as root"""
+    if os.geteuid() == 0:
+        shutil.copyfile(src, dst)
+        return os.stat(dst).st_size
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in {errno.EXDEV, errno.EPERM, errno.EMLINK}:
+            raise
+        logging.warning(f"Failed to hardlink `{src}`: {e}. Copying the file instead.")
+        shutil.copyfile(src, dst)
+    return os.stat(dst).st_size
+
+
+@functools.lru_cache()
+def get_resource_cache() -> Optional[ResourceCache]:
+    """Get the resource cache of the worker, None if it is disabled"""
+    worker_config = get_worker_config()
+    if not worker_config.resource_cache_size:
+        return None
+    return ResourceCache(worker_config.resource_cache_dir, worker_config.resource_cache_size)
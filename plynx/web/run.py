@@ -35,11 +35,30 @@ def pick_a_run():
     """Find a single run and return it"""
     data = json.loads(request.data)
 
-    node_dict = node_collection_manager.pick_node(kinds=data["kinds"])
+    node_dict = node_collection_manager.pick_node(
+        kinds=data["kinds"],
+        worker_id=data.get("worker_id"),
+        lease_duration=data.get("lease_duration"),
+    )
 
     return make_success_response({"node": node_dict})
 
 
+@app.route("/plynx/api/v0/renew_run_leases", methods=["POST"])
+@handle_errors
+def renew_run_leases():
+    """Extend the leases of the runs executed by the worker"""
+    data = json.loads(request.data)
+
+    run_ids = node_collection_manager.renew_leases(
+        run_ids=data["run_ids"],
+        worker_id=data["worker_id"],
+        lease_duration=data["lease_duration"],
+    )
+
+    return make_success_response({"run_ids": run_ids})
+
+
 @app.route("/plynx/api/v0/update_run", methods=["POST"])
 @handle_errors
 def update_run():
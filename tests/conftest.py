@@ -0,0 +1,13 @@
+"""Shared fixtures"""
+import mongomock
+import pytest
+
+import plynx.utils.db_connector
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """In-memory database returned by `get_db_connector()`"""
+    db = mongomock.MongoClient()[plynx.utils.db_connector.PLYNX_DB]
+    monkeypatch.setattr(plynx.utils.db_connector, "_DB", db)
+    return db
@@ -1,4 +1,6 @@
 """Test DB object"""
+import time
+
 from plynx.constants import ParameterTypes
 from plynx.db.node import Input, Node, Output, Parameter
 
@@ -84,3 +86,51 @@ def test_serialization():
     print(node2_dict)
 
     assert compare_dictionaries(node1_dict, node2_dict), "Serialized nodes are not equal"
+
+
+def test_snapshot():
+    """Test lightweight copy of the Node"""
+    node = get_test_node()
+    node.inputs[0].values = ["resource_0"]
+    node.get_log_by_name("stdout")
+    snapshot = node.snapshot()
+
+    snapshot.inputs[0].values.append("resource_1")
+    snapshot.outputs[0].values = ["resource_2"]
+    snapshot.get_log_by_name("stdout").values.append("resource_3")
+    snapshot.get_log_by_name("stderr")
+    snapshot.node_running_status = "SUCCESS"
+
+    assert node.inputs[0].values == ["resource_0"], "Inputs of the original Node should not change"
+    assert node.outputs[0].values == [], "Outputs of the original Node should not change"
+    assert node.get_log_by_name("stdout").values == [], "Logs of the original Node should not change"
+    assert len(node.logs) == 1, "Logs of the original Node should not change"
+    assert node.node_running_status != "SUCCESS"
+    assert snapshot.to_dict()["parameters"] == node.to_dict()["parameters"]
+
+
+def test_snapshot_benchmark():
+    """Snapshot should be much cheaper than the full copy of a Node with large parameters"""
+    node = get_test_node()
+    for i in range(200):
+        node.parameters.append(
+            Parameter(
+                name=f"param_{i}",
+                parameter_type=ParameterTypes.STR,
+                value="x" * 10000,
+            )
+        )
+    num_iterations = 20
+
+    start_time = time.time()
+    for _ in range(num_iterations):
+        node.copy()
+    copy_time = time.time() - start_time
+
+    start_time = time.time()
+    for _ in range(num_iterations):
+        node.snapshot()
+    snapshot_time = time.time() - start_time
+
+    print(f"copy: {copy_time / num_iterations:.6f}s, snapshot: {snapshot_time / num_iterations:.6f}s")
+    assert snapshot_time * 10 < copy_time, f"Snapshot took {snapshot_time:.4f}s, copy took {copy_time:.4f}s"
@@ -0,0 +1,29 @@
+"""Test the lookup of the cached Operations"""
+import datetime
+
+from plynx.constants import Collections
+from plynx.db.node import Node, Output
+from plynx.db.node_cache import NodeCache
+from plynx.db.node_cache_manager import NodeCacheManager
+from plynx.utils.common import ObjectId
+
+
+def _save_cache(mongo_db, node: Node, value: str, insertion_date: datetime.datetime) -> NodeCache:
+    node_cache = NodeCache.instantiate(node=node, run_id=ObjectId())
+    node_cache.outputs = [Output(name="out", values=[value])]
+    node_cache.save()
+    mongo_db[Collections.NODE_CACHE].update_one({"_id": node_cache._id}, {"$set": {"insertion_date": insertion_date}})
+    return node_cache
+
+
+def test_get_many(mongo_db):
+    cached_node, not_cached_node = Node(original_node_id=ObjectId()), Node(original_node_id=ObjectId())
+    now = datetime.datetime.utcnow()
+    _save_cache(mongo_db, cached_node, "old", now - datetime.timedelta(hours=1))
+    latest_cache = _save_cache(mongo_db, cached_node, "latest", now)
+    _save_cache(mongo_db, cached_node, "older", now - datetime.timedelta(hours=2))
+
+    caches = NodeCacheManager.get_many([cached_node, not_cached_node, cached_node])
+    assert [cache._id if cache else None for cache in caches] == [latest_cache._id, None, latest_cache._id]
+    assert caches[0].outputs[0].values == ["latest"]
+    assert NodeCacheManager.get_many([]) == []
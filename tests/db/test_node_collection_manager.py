@@ -0,0 +1,64 @@
+"""Test the leases of the runs"""
+import datetime
+
+from plynx.constants import Collections, NodeRunningStatus
+from plynx.db.node import Node
+from plynx.db.node_collection_manager import NodeCollectionManager
+
+KIND = "basic-bash-jinja2-operation"
+LEASE_DURATION = 60
+
+
+def _save_run(node_running_status: str = NodeRunningStatus.READY) -> Node:
+    node = Node(title="Run", kind=KIND, node_running_status=node_running_status)
+    node.save(collection=Collections.RUNS)
+    return node
+
+
+def test_pick_node(mongo_db):
+    run = _save_run()
+    manager = NodeCollectionManager(collection=Collections.RUNS)
+
+    run_dict = manager.pick_node(kinds=[KIND], worker_id="worker_1", lease_duration=LEASE_DURATION)
+    assert run_dict["_id"] == run._id
+    assert run_dict["node_running_status"] == NodeRunningStatus.RUNNING
+    assert run_dict["worker_id"] == "worker_1"
+    assert run_dict["lease_expiration_date"] > datetime.datetime.utcnow()
+
+    assert manager.pick_node(kinds=[KIND], worker_id="worker_2", lease_duration=LEASE_DURATION) is None, \
+        "The run with an active lease should not be picked"
+
+
+def test_renew_leases(mongo_db):
+    run = _save_run()
+    manager = NodeCollectionManager(collection=Collections.RUNS)
+    lease_expiration_date = manager.pick_node(kinds=[KIND], worker_id="worker_1", lease_duration=1)["lease_expiration_date"]
+
+    assert manager.renew_leases([run._id], worker_id="worker_1", lease_duration=LEASE_DURATION) == [run._id]
+    assert mongo_db[Collections.RUNS].find_one({"_id": run._id})["lease_expiration_date"] > lease_expiration_date
+
+    assert manager.renew_leases([run._id], worker_id="worker_2", lease_duration=LEASE_DURATION) == [], \
+        "Only the owner can renew the lease"
+
+    mongo_db[Collections.RUNS].update_one({"_id": run._id}, {"$set": {"node_running_status": NodeRunningStatus.SUCCESS}})
+    assert manager.renew_leases([run._id], worker_id="worker_1", lease_duration=LEASE_DURATION) == [], \
+        "Finished runs do not need leases"
+
+
+def test_repick_node_with_expired_lease(mongo_db):
+    run = _save_run()
+    manager = NodeCollectionManager(collection=Collections.RUNS)
+    manager.pick_node(kinds=[KIND], worker_id="worker_1", lease_duration=LEASE_DURATION)
+
+    # The worker has not renewed the lease
+    mongo_db[Collections.RUNS].update_one(
+        {"_id": run._id},
+        {"$set": {"lease_expiration_date": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}},
+    )
+    run_dict = manager.pick_node(kinds=[KIND], worker_id="worker_2", lease_duration=LEASE_DURATION)
+    assert run_dict["_id"] == run._id
+    assert run_dict["worker_id"] == "worker_2"
+
+    assert manager.renew_leases([run._id], worker_id="worker_1", lease_duration=LEASE_DURATION) == [], \
+        "The previous owner should find out it has lost the lease"
+    assert manager.renew_leases([run._id], worker_id="worker_2", lease_duration=LEASE_DURATION) == [run._id]
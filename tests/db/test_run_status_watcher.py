@@ -0,0 +1,23 @@
+"""Test the run status watcher"""
+import threading
+
+from plynx.db.run_status_watcher import RunStatusWatcher
+from plynx.utils.common import ObjectId
+
+
+def test_notify_subscribers():
+    watcher = RunStatusWatcher(use_change_stream=False)
+    run_id, other_run_id = ObjectId(), ObjectId()
+    event = threading.Event()
+
+    watcher.subscribe(run_id, event)
+    watcher.notify(other_run_id)
+    assert not event.is_set(), "Event should not be set by another run"
+
+    watcher.notify(str(run_id))
+    assert event.is_set(), "Event should be set when the run is finished"
+
+    event.clear()
+    watcher.unsubscribe(run_id, event)
+    watcher.notify(run_id)
+    assert not event.is_set(), "Unsubscribed event should not be set"
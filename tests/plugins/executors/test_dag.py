@@ -0,0 +1,295 @@
+"""Test the DAG scheduler core."""
+import copy
+import time
+
+import plynx.db.run_status_watcher
+from plynx.constants import Collections, NodeRunningStatus, ParameterTypes
+from plynx.db.node import Input, InputReference, Node, Output, Parameter
+from plynx.db.run_status_watcher import RunStatusWatcher
+from plynx.plugins.executors.dag import DAG
+from plynx.utils.common import ObjectId
+
+NUM_SYNTHETIC_NODES = 10000
+# Generous limit: quadratic bookkeeping takes minutes on this graph
+SYNTHETIC_GRAPH_TIME_LIMIT = 10.0
+
+
+def create_fan_in_flow(num_nodes: int) -> Node:
+    """Create a graph where every node but the last one is an input to the last one.
+    Structure:
+        S_0 ------+
+        S_1 ------+-> Sink
+        ...       |
+        S_{N-2} --+
+    """
+    dag_node = DAG.get_default_node(is_workflow=True)
+    nodes = dag_node.get_sub_nodes()
+
+    sources = [
+        Node(title=f"S_{i}", outputs=[Output(name="out")])
+        for i in range(num_nodes - 1)
+    ]
+    sink = Node(
+        title="Sink",
+        inputs=[
+            Input(
+                name="in",
+                is_array=True,
+                input_references=[InputReference(node_id=source._id, output_id="out") for source in sources],
+            ),
+        ],
+    )
+
+    nodes.extend(sources)
+    nodes.append(sink)
+    return dag_node
+
+
+def test_synthetic_fan_in_bookkeeping():
+    flow_node = create_fan_in_flow(NUM_SYNTHETIC_NODES)
+    sink = flow_node.get_sub_nodes()[-1]
+
+    start_time = time.time()
+    executor = DAG(flow_node)
+    ready_node_ids = executor.dependency_index_to_node_ids[0]
+    assert len(ready_node_ids) == NUM_SYNTHETIC_NODES - 1, "All of the sources should be ready"
+    assert sink._id not in ready_node_ids
+
+    for node_id in list(ready_node_ids):
+        executor._set_node_status(node_id, NodeRunningStatus.SUCCESS)
+    assert executor.node_id_to_dependency_index[sink._id] == 0, "Sink should have no dependencies left"
+    assert sink._id in executor.dependency_index_to_node_ids[0]
+
+    executor._set_node_status(sink._id, NodeRunningStatus.SUCCESS)
+    elapsed_time = time.time() - start_time
+
+    assert executor.finished(), "DAG should be finished"
+    assert elapsed_time < SYNTHETIC_GRAPH_TIME_LIMIT, f"Scheduling {NUM_SYNTHETIC_NODES} nodes took {elapsed_time:.2f}s"
+
+
+def test_multiple_references_to_the_same_node():
+    flow_node = create_fan_in_flow(3)
+    source, _, sink = flow_node.get_sub_nodes()
+    sink.inputs[0].input_references.append(InputReference(node_id=source._id, output_id="out"))
+
+    executor = DAG(flow_node)
+    assert executor.node_id_to_dependents[source._id][sink._id] == 2
+    assert executor.node_id_to_dependency_index[sink._id] == 3
+
+    executor._set_node_status(source._id, NodeRunningStatus.SUCCESS)
+    assert executor.node_id_to_dependency_index[sink._id] == 1
+
+
+def create_chain_and_single_flow() -> Node:
+    """Create a graph with a long chain and a single node.
+    Structure:
+        A -> B -> C
+
+        D
+    """
+    dag_node = DAG.get_default_node(is_workflow=True)
+    nodes = dag_node.get_sub_nodes()
+
+    prev_node = None
+    for title in "ABCD":
+        node = Node(title=title, inputs=[Input(name="in", is_array=True)], outputs=[Output(name="out")])
+        if prev_node and title != "D":
+            node.inputs[0].add_input_reference(prev_node._id, "out")
+        nodes.append(node)
+        prev_node = node
+    return dag_node
+
+
+def test_critical_path_priority():
+    flow_node = create_chain_and_single_flow()
+    flow_node.get_parameter_by_name("_max_running_nodes").value = 1
+    node_a, node_b, node_c, node_d = flow_node.get_sub_nodes()
+
+    executor = DAG(flow_node)
+    assert executor.node_id_to_priority[node_a._id] == 3 * DAG.DEFAULT_NODE_RUN_TIME
+    assert executor.node_id_to_priority[node_d._id] == DAG.DEFAULT_NODE_RUN_TIME
+
+    assert executor._pop_ready_node_ids() == [node_a._id], "The head of the longest chain should go first"
+    assert executor._pop_ready_node_ids() == [node_d._id]
+
+    # Historical run time makes D the most critical node
+    executor._update_priorities({
+        node_a._id: 1.0,
+        node_b._id: 1.0,
+        node_c._id: 1.0,
+        node_d._id: 10.0,
+    })
+    assert executor.node_id_to_priority[node_d._id] > executor.node_id_to_priority[node_a._id]
+
+
+def create_nested_flow() -> Node:
+    """Create a workflow with a nested DAG.
+    Structure:
+        A -> S[Input -> B -> Output] -> C
+    """
+    dag_node = DAG.get_default_node(is_workflow=True)
+    dag_node.get_parameter_by_name("_inline_sub_dags").value = True
+    nodes = dag_node.get_sub_nodes()
+
+    node_a = Node(title="A", outputs=[Output(name="out", values=["a"])])
+
+    sub_dag = DAG.get_default_node(is_workflow=False)
+    sub_dag.title = "S"
+    sub_dag.kind = "basic-dag-operation"
+    sub_dag.inputs.append(Input(name="in"))
+    sub_dag.inputs[0].add_input_reference(node_a._id, "out")
+    sub_dag.outputs.append(Output(name="out"))
+    sub_input, sub_output = sub_dag.get_sub_nodes()
+    sub_input.outputs.append(Output(name="in"))
+    node_b = Node(title="B", inputs=[Input(name="in")], outputs=[Output(name="out", values=["b"])])
+    node_b.inputs[0].add_input_reference(sub_input._id, "in")
+    sub_output.inputs.append(Input(name="out"))
+    sub_output.inputs[0].add_input_reference(node_b._id, "out")
+    sub_dag.get_sub_nodes().append(node_b)
+
+    node_c = Node(title="C", inputs=[Input(name="in")])
+    node_c.inputs[0].add_input_reference(sub_dag._id, "out")
+
+    nodes.extend([node_a, sub_dag, node_c])
+    return dag_node
+
+
+def test_inline_sub_dags():
+    flow_node = create_nested_flow()
+    node_a, sub_dag, node_c = flow_node.get_sub_nodes()
+    node_b = sub_dag.get_sub_nodes()[-1]
+
+    executor = DAG(flow_node)
+    assert set(executor.node_id_to_node) == {node_a._id, node_b._id, node_c._id}, "Nested DAG should be replaced with its subnodes"
+    assert executor.node_id_to_dependents[node_a._id] == {node_b._id: 1}
+    assert executor.node_id_to_dependents[node_b._id] == {node_c._id: 1}
+
+    assert executor._pop_ready_node_ids() == [node_a._id]
+    finished_node = node_a.snapshot()
+    finished_node.node_running_status = NodeRunningStatus.SUCCESS
+    executor.update_node(finished_node)
+    assert executor._pop_ready_node_ids() == [node_b._id]
+    executor._update_inlined_graph_status(sub_dag._id, NodeRunningStatus.IN_QUEUE)
+    assert sub_dag.node_running_status == NodeRunningStatus.RUNNING
+
+    # The worker sends back a snapshot with the new outputs
+    finished_node = node_b.snapshot()
+    finished_node.node_running_status = NodeRunningStatus.SUCCESS
+    finished_node.outputs[0].values = ["result"]
+    executor.update_node(finished_node)
+    assert sub_dag.node_running_status == NodeRunningStatus.SUCCESS
+    assert sub_dag.outputs[0].values == ["result"]
+    assert executor._pop_ready_node_ids() == [node_c._id]
+
+
+def test_inline_duplicated_sub_dag():
+    flow_node = create_nested_flow()
+    node_a, sub_dag, node_c = flow_node.get_sub_nodes()
+    node_b = sub_dag.get_sub_nodes()[-1]
+    # Copies of the nested DAG get a new ID, but keep the IDs of their subnodes
+    sub_dag_copy = copy.deepcopy(sub_dag)
+    sub_dag_copy._id = ObjectId()
+    flow_node.get_sub_nodes().append(sub_dag_copy)
+
+    executor = DAG(flow_node)
+    assert set(executor.node_id_to_node) == {node_a._id, node_b._id, node_c._id, sub_dag_copy._id}, \
+        "Only the first instance of the nested DAG should be inlined"
+    assert executor.uncompleted_nodes_count == 4
+
+    assert executor._pop_ready_node_ids() == [node_a._id]
+    executor._set_node_status(node_a._id, NodeRunningStatus.SUCCESS)
+    assert set(executor._pop_ready_node_ids()) == {node_b._id, sub_dag_copy._id}
+    executor._set_node_status(node_b._id, NodeRunningStatus.SUCCESS)
+    executor._set_node_status(sub_dag_copy._id, NodeRunningStatus.SUCCESS)
+    assert executor._pop_ready_node_ids() == [node_c._id]
+    executor._set_node_status(node_c._id, NodeRunningStatus.SUCCESS)
+    assert executor.finished()
+
+
+def test_retry_failed_node():
+    flow_node = create_fan_in_flow(2)
+    source, sink = flow_node.get_sub_nodes()
+    source.parameters.extend([
+        Parameter(name="_retries", parameter_type=ParameterTypes.INT, value=1),
+        Parameter(name="_retry_backoff", parameter_type=ParameterTypes.FLOAT, value=0),
+    ])
+    source.logs.append(Output(name="worker"))
+
+    executor = DAG(flow_node)
+    assert executor._pop_ready_node_ids() == [source._id]
+
+    failed_node = source.snapshot()
+    failed_node.node_running_status = NodeRunningStatus.FAILED
+    failed_node.get_log_by_name("worker").values = ["attempt_1_log"]
+    executor.update_node(failed_node)
+    assert not NodeRunningStatus.is_failed(executor._node_running_status), "The node should be relaunched instead"
+    assert source.get_log_by_name("worker").values == []
+    assert source.get_log_by_name("worker_attempt_1").values == ["attempt_1_log"]
+    assert executor._pop_ready_node_ids() == [source._id]
+
+    failed_node = source.snapshot()
+    failed_node.node_running_status = NodeRunningStatus.FAILED
+    executor.update_node(failed_node)
+    assert NodeRunningStatus.is_failed(executor._node_running_status), "No retries left"
+    assert sink._id not in executor.dependency_index_to_node_ids[0]
+
+
+def _fail_node_with_pending_retry(executor: DAG, node: Node):
+    node.parameters.extend([
+        Parameter(name="_retries", parameter_type=ParameterTypes.INT, value=1),
+        Parameter(name="_retry_backoff", parameter_type=ParameterTypes.FLOAT, value=3600),
+    ])
+    failed_node = node.snapshot()
+    failed_node.node_running_status = NodeRunningStatus.FAILED
+    executor.update_node(failed_node)
+    assert node.node_running_status == NodeRunningStatus.IN_QUEUE, "The node should wait to be relaunched"
+
+
+def test_sibling_fails_while_retry_is_pending():
+    flow_node = create_fan_in_flow(3)
+    source_with_retries, source, _ = flow_node.get_sub_nodes()
+
+    executor = DAG(flow_node)
+    executor._pop_ready_node_ids()
+    _fail_node_with_pending_retry(executor, source_with_retries)
+
+    failed_node = source.snapshot()
+    failed_node.node_running_status = NodeRunningStatus.FAILED
+    executor.update_node(failed_node)
+
+    assert executor.finished(), "The pending retry should not block the failed DAG"
+    assert executor._node_running_status == NodeRunningStatus.FAILED
+    assert source_with_retries.node_running_status == NodeRunningStatus.CANCELED
+    assert executor.pop_jobs() == []
+
+
+def test_kill_while_retry_is_pending():
+    flow_node = create_fan_in_flow(2)
+    source, _ = flow_node.get_sub_nodes()
+
+    executor = DAG(flow_node)
+    executor._pop_ready_node_ids()
+    _fail_node_with_pending_retry(executor, source)
+
+    executor.kill()
+    assert executor.finished(), "The pending retry should not block the canceled DAG"
+    assert source.node_running_status == NodeRunningStatus.CANCELED
+    assert executor.retry_queue == []
+
+
+def test_resume_launched_nodes(mongo_db, monkeypatch):
+    monkeypatch.setattr(plynx.db.run_status_watcher, "run_status_watcher", lambda: RunStatusWatcher(use_change_stream=False))
+    flow_node = create_fan_in_flow(3)
+    launched_source, source, _ = flow_node.get_sub_nodes()
+    # The DAG has been re-picked after both of the sources were put on the queue, but only one of them was launched
+    for node in [launched_source, source]:
+        node.kind = "basic-bash-jinja2-operation"
+        node.node_running_status = NodeRunningStatus.IN_QUEUE
+    launched_source.save(collection=Collections.RUNS)
+
+    executor = DAG(flow_node)
+    executor._resume_launched_nodes()
+    assert [monitoring_executor.node._id for monitoring_executor in executor.monitoring_executors] == [launched_source._id], \
+        "The launched node should be monitored instead of being launched again"
+    assert source.node_running_status == NodeRunningStatus.READY
+    assert executor._pop_ready_node_ids() == [source._id]
@@ -0,0 +1,42 @@
+"""Test the cache of the deserialized inputs."""
+from plynx.plugins.executors.python.input_cache import InputCache, InputCacheMode, estimate_size
+
+
+def test_input_is_deserialized_once():
+    num_loads = []
+
+    def preprocess_input(resource_id):
+        num_loads.append(resource_id)
+        return {"values": [1, 2, 3]}
+
+    copy_cache = InputCache(max_size=10 ** 6)
+    assert copy_cache.mode == InputCacheMode.COPY, "Consumers should get copies by default"
+    for _ in range(2):
+        value = copy_cache.get_or_load("resource", preprocess_input)
+        assert value == {"values": [1, 2, 3]}, "Consumers should get copies"
+        value["values"].append(4)
+    assert num_loads == ["resource"]
+    assert (copy_cache.hits, copy_cache.misses) == (1, 1)
+
+    shared_cache = InputCache(max_size=10 ** 6, mode=InputCacheMode.SHARED)
+    value = shared_cache.get_or_load("resource", preprocess_input)
+    assert shared_cache.get_or_load("resource", preprocess_input) is value
+
+
+def test_copy_unpicklable_input():
+    cache = InputCache(max_size=10 ** 6, mode=InputCacheMode.COPY)
+    for _ in range(2):
+        value = cache.get_or_load("resource", lambda _: {"values": [1], "func": lambda: None})
+        assert value["values"] == [1], "Unpicklable inputs should be deep-copied"
+        value["values"].append(2)
+
+
+def test_memory_bound():
+    value = list(range(100))
+    cache = InputCache(max_size=estimate_size(value) * 2, mode=InputCacheMode.SHARED)
+    for resource_id in ["a", "b", "c"]:
+        cache.get_or_load(resource_id, lambda _: list(range(100)))
+
+    assert cache.size <= cache.max_size
+    cache.get_or_load("a", lambda _: None)
+    assert cache.misses == 4, "The least recently used value should be evicted"
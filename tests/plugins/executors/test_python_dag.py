@@ -1,7 +1,18 @@
 """Test the node utils."""
-from plynx.db.node import Input, Output
-from plynx.plugins.executors.python.dag import DAG
-from plynx.plugins.executors.python.local import PythonNode
+import json
+import threading
+import time
+
+import pytest
+
+from plynx.constants import Collections, ParameterTypes
+from plynx.db.node import Input, Node, Output, Parameter
+from plynx.plugins.executors.python import local
+from plynx.plugins.executors.python.dag import DAG, POOL_SIZE, DAGParallel, PoolBackend
+from plynx.plugins.executors.python.local import PythonNode, _materialize_code, materialize_fn_or_cls, redirect_to_plynx_logs
+from plynx.plugins.executors.python.object_store import ObjectStore
+from plynx.utils import file_handler
+from plynx.utils.common import ObjectId
 
 
 def create_add_1_operation():
@@ -82,3 +93,224 @@ def test_python_workflow():
     for node in executor.node.get_sub_nodes():
         assert node.outputs[0].values[0] == int(node.description), f"Expected {node.description}, got {node.outputs[0].values[0]}"
     return
+
+
+def test_dag_parallel_process_pool():
+    flow_node = create_graph_flow()
+    flow_node.parameters.extend(
+        param for param in DAGParallel.get_default_node(is_workflow=True).parameters if param.name in {"_pool_size", "_pool_backend"}
+    )
+    flow_node.get_parameter_by_name("_pool_size").value = 2
+    flow_node.get_parameter_by_name("_pool_backend").value.index = 1
+    executor = DAGParallel(flow_node)
+    assert executor.pool_backend == PoolBackend.PROCESS
+
+    try:
+        executor.run()
+    finally:
+        executor.clean_up_executor()
+    for node in executor.node.get_sub_nodes():
+        assert node.outputs[0].values[0] == int(node.description), f"Expected {node.description}, got {node.outputs[0].values[0]}"
+
+
+def test_dag_parallel_wakes_up_on_kill():
+    executor = DAGParallel(create_graph_flow())
+    threading.Timer(0.1, executor.kill).start()
+
+    start_time = time.time()
+    executor._wait_for_updates()
+    assert time.time() - start_time < DAGParallel.GRAPH_ITERATION_SLEEP, "Scheduler should be woken up by the kill"
+    assert executor.pop_jobs() == []
+
+
+@pytest.mark.parametrize("executor_class", [DAG, DAGParallel])
+def test_in_memory_outputs(executor_class, monkeypatch, mongo_db):
+    flow_node = create_graph_flow()
+    flow_node.get_parameter_by_name("_in_memory_outputs").value = True
+    add_a, add_b, add_c, add_d = flow_node.get_sub_nodes()[-4:]
+    add_b.parameters.append(Parameter(name="_cacheable", parameter_type=ParameterTypes.BOOL, value=True))
+    # Primitive values are stored in the nodes
+    for node in [add_a, add_b, add_c, add_d]:
+        node.outputs[0].file_type = "py-json-file"
+        for node_input in node.inputs:
+            if node_input.input_references:
+                node_input.file_type = "py-json-file"
+    written_values = []
+    resource_class = local._resource_manager.kind_to_resource_class["py-json-file"]
+    original_postprocess_output = resource_class.postprocess_output
+
+    def tracking_postprocess_output(value):
+        written_values.append(value)
+        return original_postprocess_output(value)
+
+    monkeypatch.setattr(resource_class, "postprocess_output", staticmethod(tracking_postprocess_output))
+    executor = executor_class(flow_node)
+    try:
+        executor.run()
+    finally:
+        executor.clean_up_executor()
+
+    assert sorted(written_values) == [1, 3], "Only the outputs of the cacheable and the last nodes should be written"
+    assert len(executor.object_store) == 0, "All of the objects should be released"
+    cached_resource_id = mongo_db[Collections.NODE_CACHE].find_one()["outputs"][0]["values"][0]
+    assert resource_class.preprocess_input(cached_resource_id) == 1, "Cache should refer to the written output"
+    for node in [add_b, add_d]:
+        assert resource_class.preprocess_input(executor.node_id_to_node[node._id].outputs[0].values[0]) == int(node.description)
+    for node in [add_a, add_c]:
+        assert executor.node_id_to_node[node._id].outputs[0].values == [], "Values that are not written should be removed"
+    for node in executor.node.get_sub_nodes():
+        for node_input in node.inputs:
+            assert not any(map(ObjectStore.is_object_id, node_input.values))
+
+
+def test_object_store_persisted_outputs():
+    node_id = ObjectId()
+    object_store = ObjectStore()
+    object_store.expect(node_id, "out", ref_count=2, persist=True)
+    value = {"values": [1]}
+    resource_id = object_store.put(node_id, "out", json.dumps, value)
+
+    assert resource_id == json.dumps(value), "Persisted output should be written"
+    assert resource_id in object_store
+    assert object_store.get(resource_id) is value, "Consumers should get the object without deserialization"
+    assert object_store.get(resource_id) is value
+    assert resource_id not in object_store, "The object should be released after the last consumer"
+
+
+def test_materialize_code_cache():
+    node = create_add_1_operation()
+    cache_info = _materialize_code.cache_info()
+
+    func = materialize_fn_or_cls(node)
+    assert materialize_fn_or_cls(create_add_1_operation()) is func, "The same code should be compiled once"
+    assert _materialize_code.cache_info().hits >= cache_info.hits + 1
+
+
+def test_redirect_to_plynx_logs_in_threads():
+    nodes = [Node(logs=[Output(name="stdout"), Output(name="stderr")]) for _ in range(4)]
+    barrier = threading.Barrier(len(nodes))
+
+    def print_logs(node_index):
+        with redirect_to_plynx_logs(nodes[node_index], "stdout", "stderr"):
+            barrier.wait(timeout=10)
+            for _ in range(100):
+                print(f"node {node_index}")
+
+    threads = [threading.Thread(target=print_logs, args=(node_index,)) for node_index in range(len(nodes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for node_index, node in enumerate(nodes):
+        with file_handler.open(node.get_log_by_name("stdout").values[0], "r") as f:
+            assert f.read() == f"node {node_index}\n" * 100, "Logs of the concurrent operations should not be mixed"
+        assert node.get_log_by_name("stderr").values == []
+
+
+def create_map_operation(num_values: int, batch_size: int, is_async: bool = False):
+    """Operation that adds 1 to every value of the array input"""
+    node = PythonNode.get_default_node(is_workflow=False)
+    node.inputs = [Input(name="values", file_type="int", is_array=True, values=list(range(num_values)))]
+    node.outputs = [Output(name="out", file_type="int", is_array=True)]
+    node.get_parameter_by_name("_cmd").value.value = (
+        f"{'async ' if is_async else ''}def operation(values):\n"
+        "    return {\"out\": [value + 1 for value in values]}\n"
+    )
+    node.get_parameter_by_name("_map_input").value = "values"
+    node.get_parameter_by_name("_batch_size").value = batch_size
+    return node
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+@pytest.mark.parametrize("batch_size, expected_num_calls", [(1, 2500), (1000, 3), (0, 1)])
+def test_map_mode(monkeypatch, batch_size, expected_num_calls, is_async):
+    num_values = 2500
+    node = create_map_operation(num_values, batch_size, is_async)
+    func = materialize_fn_or_cls(node)
+    batch_sizes = []
+
+    def counting_func(values):
+        batch_sizes.append(len(values))
+        return func(values)
+
+    async def async_counting_func(values):
+        return await counting_func(values)
+
+    monkeypatch.setattr(local, "materialize_fn_or_cls", lambda _: async_counting_func if is_async else counting_func)
+    PythonNode(node).run()
+    assert node.outputs[0].values == list(range(1, num_values + 1))
+    assert len(batch_sizes) == expected_num_calls, "The operation should be called once per batch"
+    assert sum(batch_sizes) == num_values
+
+
+def test_map_mode_benchmark():
+    num_values = 20000
+    values_per_sec = {}
+    for batch_size in [1, 1000]:
+        elapsed_times = []
+        # The best of several runs is less sensitive to the noise of the machine
+        for _ in range(3):
+            node = create_map_operation(num_values, batch_size)
+            start_time = time.perf_counter()
+            PythonNode(node).run()
+            elapsed_times.append(time.perf_counter() - start_time)
+            assert node.outputs[0].values == list(range(1, num_values + 1))
+        values_per_sec[batch_size] = num_values / min(elapsed_times)
+
+    print(f"Per item: {values_per_sec[1]:.0f} values/sec, batched: {values_per_sec[1000]:.0f} values/sec")
+    assert values_per_sec[1000] > values_per_sec[1], "Batches should have higher throughput than single items"
+
+
+def test_async_operations_run_concurrently():
+    num_nodes = 4 * POOL_SIZE
+    sleep_time = 0.5
+    dag_node = DAGParallel.get_default_node(is_workflow=True)
+    dag_node.kind = "python-workflow"
+    for index in range(num_nodes):
+        node = create_add_1_operation()
+        node.title = f"Async {index}"
+        node.get_parameter_by_name("_cmd").value.value = (
+            "import asyncio\n"
+            "async def operation(input_a, input_b):\n"
+            f"    await asyncio.sleep({sleep_time})\n"
+            "    return {\"out\": input_a + input_b + 1}\n"
+        )
+        dag_node.get_sub_nodes().append(node)
+    executor = DAGParallel(dag_node)
+
+    start_time = time.time()
+    try:
+        executor.run()
+    finally:
+        executor.clean_up_executor()
+    # Blocking Operations would need `num_nodes / POOL_SIZE` rounds
+    assert time.time() - start_time < num_nodes * sleep_time / POOL_SIZE, "Async Operations should not occupy the pool workers"
+    for node in executor.node.get_sub_nodes():
+        assert node.outputs[0].values[0] == 1
+
+
+def test_async_operation_does_not_block_event_loop(monkeypatch):
+    node = create_add_1_operation()
+    node.get_parameter_by_name("_cmd").value.value = (
+        "async def operation(input_a, input_b):\n"
+        "    print('log')\n"
+        "    return {\"out\": input_a + input_b + 1}\n"
+    )
+    blocking_calls = []
+
+    def track_thread(name, func):
+        def wrapper(*args, **kwargs):
+            blocking_calls.append((name, threading.get_ident()))
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(local, "prep_args", track_thread("prep_args", local.prep_args))
+    monkeypatch.setattr(local, "assign_outputs", track_thread("assign_outputs", local.assign_outputs))
+    monkeypatch.setattr(file_handler, "open", track_thread("open", file_handler.open))
+
+    # `asyncio.run()` runs the event loop in the current thread
+    PythonNode(node).run()
+    assert node.outputs[0].values == [1]
+    assert {name for name, _ in blocking_calls} == {"prep_args", "assign_outputs", "open"}
+    assert all(thread_id != threading.get_ident() for _, thread_id in blocking_calls), "Blocking calls should not run on the event loop"
@@ -0,0 +1,54 @@
+"""Test staging of the inputs of the bash Operations."""
+import io
+import os
+
+import pytest
+
+from plynx.plugins.executors import local
+from plynx.plugins.resources.common import Directory, File
+from plynx.utils import file_handler
+from plynx.utils.archive import CODECS, pack_directory
+
+
+@pytest.fixture
+def num_opened_streams(monkeypatch):
+    """Count the streams opened from the storage"""
+    counter = {"value": 0}
+    original_get_file_stream = local.get_file_stream
+
+    def counting_get_file_stream(*args, **kwargs):
+        counter["value"] += 1
+        return original_get_file_stream(*args, **kwargs)
+
+    monkeypatch.setattr(local, "get_file_stream", counting_get_file_stream)
+    monkeypatch.setattr(local, "get_resource_cache", lambda: None)
+    return counter
+
+
+def test_stage_file_input(tmp_path, num_opened_streams):
+    resource_id = file_handler.upload_file_stream(io.BytesIO(b"content"))
+    filename = os.path.join(tmp_path, "input")
+
+    assert local.BaseBash._stage_input(resource_id, filename, File) == len(b"content")
+    assert num_opened_streams["value"] == 1, "Plain resources should be downloaded without staging from the stream"
+    with open(filename, "rb") as f:
+        assert f.read() == b"content"
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_stage_directory_input(tmp_path, codec, num_opened_streams):
+    path = os.path.join(tmp_path, "dir")
+    os.mkdir(path)
+    with open(os.path.join(path, "a.txt"), "w") as f:
+        f.write("a")
+    archive_filename = pack_directory(path, codec)
+    with open(archive_filename, "rb") as f:
+        resource_id = file_handler.upload_file_stream(f)
+    filename = os.path.join(tmp_path, "input")
+
+    num_bytes = local.BaseBash._stage_input(resource_id, filename, Directory)
+    assert num_bytes == os.path.getsize(archive_filename), "Bytes read from the storage should be reported"
+    Directory.prepare_input(filename)
+    assert num_opened_streams["value"] == 1, "Archive should be read from the storage once"
+    with open(os.path.join(filename, "a.txt")) as f:
+        assert f.read() == "a"
@@ -0,0 +1,34 @@
+"""Test the registry of stateful python Operations."""
+import threading
+
+from plynx.plugins.executors.python.stateful_registry import StatefulRegistry
+
+
+def test_slow_init_does_not_block_other_keys():
+    registry = StatefulRegistry(capacity=2)
+    release_slow_init = threading.Event()
+
+    def slow_init():
+        release_slow_init.wait(timeout=10)
+        return "slow"
+
+    thread = threading.Thread(target=registry.get_or_create, args=("slow", slow_init))
+    thread.start()
+    assert registry.get_or_create("fast", lambda: "fast") == "fast"
+    assert "slow" not in registry, "Slow instance should still be initializing"
+
+    release_slow_init.set()
+    thread.join()
+    assert registry.get_or_create("slow", lambda: "other") == "slow"
+
+
+def test_lru_eviction():
+    registry = StatefulRegistry(capacity=2)
+    registry.get_or_create("a", object)
+    registry.get_or_create("b", object)
+    registry.get_or_create("a", object)
+    registry.get_or_create("c", object)
+
+    assert len(registry) == 2
+    assert "a" in registry
+    assert "b" not in registry, "Least recently used instance should be evicted"
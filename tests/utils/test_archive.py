@@ -0,0 +1,87 @@
+"""Test packing of the directories."""
+import io
+import os
+import tarfile
+
+import pytest
+
+from plynx.utils.archive import CODECS, DirectoryCodec, extract_file, extract_stream, list_archive, pack_directory
+
+
+def _create_directory(path):
+    os.makedirs(os.path.join(path, "sub"))
+    for name, content in [("a.txt", b"a" * 1000), (os.path.join("sub", "b.bin"), os.urandom(1000))]:
+        with open(os.path.join(path, name), "wb") as f:
+            f.write(content)
+
+
+def _read_directory(path):
+    res = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            with open(os.path.join(root, name), "rb") as f:
+                res[os.path.relpath(os.path.join(root, name), path)] = f.read()
+    return res
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_pack_and_extract(tmp_path, codec):
+    path = os.path.join(tmp_path, "dir")
+    _create_directory(path)
+    archive_filename = pack_directory(path, codec)
+
+    extract_file(archive_filename, os.path.join(tmp_path, "from_file"))
+    assert _read_directory(os.path.join(tmp_path, "from_file")) == _read_directory(path)
+
+    with open(archive_filename, "rb") as f:
+        assert sorted(name for name in list_archive(f) if name.endswith(".txt") or name.endswith(".bin")) == ["a.txt", "sub/b.bin"]
+
+    with open(archive_filename, "rb") as f:
+        extracted = extract_stream(f, os.path.join(tmp_path, "from_stream"))
+    assert extracted == (codec in {DirectoryCodec.TAR, DirectoryCodec.TAR_GZ}), "Only tar archives can be extracted from a stream"
+    if not extracted:
+        # Zip archive is saved as is, so that it is not downloaded twice
+        os.rename(os.path.join(tmp_path, "from_stream"), os.path.join(tmp_path, "from_stream.archive"))
+        extract_file(os.path.join(tmp_path, "from_stream.archive"), os.path.join(tmp_path, "from_stream"))
+    assert _read_directory(os.path.join(tmp_path, "from_stream")) == _read_directory(path)
+
+
+def _add_tar_member(tar_file, name, data=b"", linkname=None, member_type=tarfile.REGTYPE):
+    tar_info = tarfile.TarInfo(name)
+    tar_info.type = member_type
+    tar_info.size = len(data)
+    if linkname is not None:
+        tar_info.linkname = linkname
+    tar_file.addfile(tar_info, io.BytesIO(data))
+
+
+@pytest.mark.parametrize("use_data_filter", [True, False])
+@pytest.mark.parametrize("members", [
+    [("../escape", None, tarfile.REGTYPE)],
+    [("{tmp_path}/escape", None, tarfile.REGTYPE)],
+    [("link", "..", tarfile.SYMTYPE), ("link/escape", None, tarfile.REGTYPE)],
+    [("link", "../../escape", tarfile.LNKTYPE)],
+    [("device", None, tarfile.CHRTYPE)],
+])
+def test_extract_unsafe_tar(tmp_path, monkeypatch, use_data_filter, members):
+    if not use_data_filter:
+        monkeypatch.delattr(tarfile, "data_filter", raising=False)
+    elif not hasattr(tarfile, "data_filter"):
+        pytest.skip("tarfile.data_filter is not available")
+    stream = io.BytesIO()
+    with tarfile.open(fileobj=stream, mode="w") as tar_file:
+        for name, linkname, member_type in members:
+            _add_tar_member(tar_file, name.format(tmp_path=tmp_path), b"escaped", linkname, member_type)
+    stream.seek(0)
+
+    path = os.path.join(tmp_path, "sub", "dir")
+    os.makedirs(os.path.dirname(path))
+    try:
+        extract_stream(stream, path)
+    except tarfile.TarError:
+        pass
+    else:
+        # Absolute paths are made relative by `tarfile.data_filter`
+        assert use_data_filter and os.path.isabs(members[0][0].format(tmp_path=tmp_path)), "Unsafe member should be rejected"
+    assert not os.path.exists(os.path.join(tmp_path, "sub", "escape"))
+    assert not os.path.exists(os.path.join(tmp_path, "escape"))
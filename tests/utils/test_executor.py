@@ -0,0 +1,59 @@
+"""Test executor utils."""
+import threading
+
+import plynx.utils.executor
+from plynx.base.executor import BaseExecutor
+from plynx.constants import NodeRunningStatus
+from plynx.db.node import Node, Parameter, ParameterTypes
+from plynx.plugins.executors.local import BashJinja2
+from plynx.utils.executor import DBJobExecutor, TickThread
+from plynx.utils.profiler import ProfilingMode
+
+
+class SleepingExecutor(BaseExecutor):
+    """Executor that runs until it is killed"""
+    def __init__(self, node: Node):
+        super().__init__(node)
+        self.killed = threading.Event()
+
+    def run(self, preview: bool = False) -> str:
+        self.killed.wait(timeout=10)
+        return NodeRunningStatus.CANCELED if self.killed.is_set() else NodeRunningStatus.SUCCESS
+
+    def launch(self):
+        raise NotImplementedError()
+
+    def kill(self):
+        self.killed.set()
+
+    def is_updated(self) -> bool:
+        return False
+
+
+def test_tick_thread_timeout():
+    node = Node(parameters=[Parameter(name="_timeout", parameter_type=ParameterTypes.INT, value=1)])
+    executor = SleepingExecutor(node)
+    TickThread.TICK_TIMEOUT = 0.1
+    try:
+        with TickThread(executor) as tick_thread:
+            status = executor.run()
+    finally:
+        TickThread.TICK_TIMEOUT = 1
+
+    assert status == NodeRunningStatus.CANCELED
+    assert tick_thread.timed_out, "The executor should be killed by the watchdog"
+
+
+def test_profile_bash_subprocess(monkeypatch):
+    # The run is saved by the API
+    monkeypatch.setattr(plynx.utils.executor, "_update_node", lambda node: None)
+    node = BashJinja2.get_default_node(is_workflow=False)
+    node.get_parameter_by_name("_cmd").value.value = (
+        "python3 -c 'data = bytearray(64 * 1024 * 1024); sum(range(10 ** 7))'\n"
+    )
+    executor = BashJinja2(node)
+
+    assert DBJobExecutor(executor, ProfilingMode.RSS).run() == NodeRunningStatus.SUCCESS
+    assert node.profile.cpu_time > 0.1, "CPU time of the subprocess should be measured, not of the idle thread"
+    assert node.profile.cpu_time <= node.profile.wall_time * 1.5
+    assert node.profile.peak_memory >= 64 * 1024 * 1024, "Max RSS of the subprocess should be measured"
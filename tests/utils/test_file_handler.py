@@ -0,0 +1,43 @@
+"""Test the file handler."""
+import hashlib
+import os
+
+from plynx.utils import file_handler
+
+
+def test_segmented_upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_handler, "SEGMENT_SIZE", 10)
+    written_sizes = []
+    original_open = file_handler.open
+
+    def tracking_open(filename, mode="rt"):
+        f = original_open(filename, mode)
+        if "w" in mode and filename != upload.resource_id:
+            original_write = f.write
+            f.write = lambda data: written_sizes.append(len(data)) or original_write(data)
+        return f
+
+    monkeypatch.setattr(file_handler, "open", tracking_open)
+    log_filename = os.path.join(tmp_path, "log")
+    upload = file_handler.SegmentedUpload()
+    content = b""
+    for chunk in [b"abc", b"defghijklmn", b"", b"o" * 25]:
+        content += chunk
+        with open(log_filename, "ab") as f:
+            f.write(chunk)
+        assert upload.upload(log_filename) == bool(chunk)
+        assert file_handler.get_file_stream(upload.resource_id).read() == content
+
+    assert written_sizes == [3, 10, 4, 10, 10, 9], "Only the last open segment should be uploaded again"
+
+
+def test_upload_file_with_checksum(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_handler, "UPLOAD_BUFFER_SIZE", 7)
+    filename = os.path.join(tmp_path, "output")
+    content = b"0123456789" * 10
+    with open(filename, "wb") as f:
+        f.write(content)
+
+    resource_id, checksum = file_handler.upload_file_with_checksum(filename)
+    assert file_handler.get_file_stream(resource_id).read() == content
+    assert checksum == hashlib.sha256(content).hexdigest()
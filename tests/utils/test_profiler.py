@@ -0,0 +1,45 @@
+"""Test the profiling of the Operations."""
+from plynx.db.node import Node
+from plynx.utils.profiler import ProfilingMode, aggregate_profiles, profile_node
+
+
+def test_profile_node():
+    node = Node(title="Allocate")
+    with profile_node(node, ProfilingMode.TRACEMALLOC):
+        data = [bytearray(1024) for _ in range(1024)]
+        del data
+
+    assert node.profile.wall_time > 0 and node.profile.cpu_time > 0
+    assert node.profile.peak_memory >= 1024 * 1024
+
+    with profile_node(node, ProfilingMode.OFF):
+        pass
+    assert node.profile.mode == ProfilingMode.TRACEMALLOC, "Profile should not be overridden when profiling is off"
+
+
+def test_concurrent_tracemalloc_profiles():
+    first_node, second_node = Node(title="First"), Node(title="Second")
+    with profile_node(first_node, ProfilingMode.TRACEMALLOC):
+        data = bytearray(4 * 1024 * 1024)
+        del data
+        with profile_node(second_node, ProfilingMode.TRACEMALLOC):
+            pass
+
+    assert first_node.profile.peak_memory >= 4 * 1024 * 1024, "Another Operation should not reset the peak"
+    assert second_node.profile.peak_memory >= 0
+
+
+def test_aggregate_profiles():
+    nodes = []
+    for title, wall_time in [("slow", 3), ("slow", 1), ("fast", 1), ("not profiled", None)]:
+        node = Node(title=title)
+        if wall_time is not None:
+            with profile_node(node, ProfilingMode.RSS):
+                pass
+            node.profile.wall_time = wall_time
+        nodes.append(node)
+
+    report = aggregate_profiles(nodes)
+    assert [(operation_profile.title, operation_profile.num_runs) for operation_profile in report] == [("slow", 2), ("fast", 1)]
+    assert report[0].mean_wall_time == 2
+    assert report[0].max_process_peak_memory > 0
@@ -0,0 +1,64 @@
+"""Test the worker-local resource cache."""
+import os
+import stat
+
+import pytest
+
+from plynx.utils import resource_cache
+from plynx.utils.resource_cache import ResourceCache
+
+
+def _download(resource_id, filename):
+    with open(filename, "wb") as f:
+        f.write(resource_id.encode() * 10)
+    return os.stat(filename).st_size
+
+
+def test_stage_hardlinks_cached_resources(tmp_path, monkeypatch):
+    monkeypatch.setattr(resource_cache.os, "geteuid", lambda: 1000)
+    downloads = []
+
+    def download(resource_id, filename):
+        downloads.append(resource_id)
+        return _download(resource_id, filename)
+
+    cache = ResourceCache(os.path.join(tmp_path, "cache"), max_size=100)
+    for workdir_index in range(2):
+        filename = os.path.join(tmp_path, f"input_{workdir_index}")
+        assert cache.stage("abc", filename, download) == 30
+    assert downloads == ["abc"]
+    assert os.stat(os.path.join(tmp_path, "input_0")).st_ino == os.stat(os.path.join(tmp_path, "input_1")).st_ino
+    assert not os.stat(os.path.join(tmp_path, "input_0")).st_mode & stat.S_IWUSR, "Cached inputs must be read-only"
+
+    for resource_id in ["def", "ghi", "jkl", "abc"]:
+        cache.stage(resource_id, os.path.join(tmp_path, resource_id + "_input"), download)
+    stats = cache.get_stats()
+    assert (stats.hits, stats.misses, stats.num_resources) == (1, 5, 3), "Least recently used resource should be evicted"
+    assert stats.size <= cache.max_size
+    with open(os.path.join(tmp_path, "input_0"), "rb") as f:
+        assert f.read() == b"abc" * 10, "Evicted files should stay in the workdirs"
+
+
+def test_stage_copies_cached_resources_as_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(resource_cache.os, "geteuid", lambda: 0)
+    cache = ResourceCache(os.path.join(tmp_path, "cache"), max_size=100)
+    filenames = [os.path.join(tmp_path, f"input_{workdir_index}") for workdir_index in range(2)]
+    for filename in filenames:
+        cache.stage("abc", filename, _download)
+
+    with open(filenames[0], "ab") as f:
+        f.write(b"changed by root")
+    with open(filenames[1], "rb") as f:
+        assert f.read() == b"abc" * 10, "Changes of the root job should not leak to the cache"
+
+
+def test_failed_download_releases_lock(tmp_path):
+    def failing_download(resource_id, filename):
+        raise IOError(f"Failed to download {resource_id} to {filename}")
+
+    cache = ResourceCache(os.path.join(tmp_path, "cache"), max_size=100)
+    with pytest.raises(IOError):
+        cache.stage("abc", os.path.join(tmp_path, "input"), failing_download)
+    assert not cache._filename_to_lock, "Lock of the resource that has not been cached should be removed"
+    assert cache.get_stats().num_resources == 0
+    assert os.listdir(cache.directory) == []